@@ -0,0 +1,119 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from langchain_classic.retrievers import EnsembleRetriever
+from langchain_classic.retrievers.document_compressors import CrossEncoderReranker
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+from hybrid_retriever import STAGES, HybridRRFRetriever
+
+PATHS = ("skip", "shrink", "full")
+
+
+class AdaptiveRerankRetriever(BaseRetriever):
+    """
+    Hybrid retrieval + cross-encoder reranking that only pays for the cross-encoder when the
+    first stage is unsure.
+
+    After rank fusion the first-stage lists are compared:
+    - skip:   all retrievers put the same chunk first, their top `agreement_k` overlap by at least
+              `skip_overlap` and in every first-stage list #1 leads #2 by at least `skip_margin`
+              of that list's score spread (see score_margin): the fused order is returned as is.
+              Without first-stage scores (EnsembleRetriever) the query is never skipped.
+    - shrink: the retrievers agree on #1 or overlap by at least `shrink_overlap`: only the first
+              `shrink_top` fused candidates are reranked, the rest keep their fused order.
+    - full:   every candidate is reranked, as CrossEncoderReranker does.
+    """
+
+    ensemble: HybridRRFRetriever | EnsembleRetriever
+    reranker: CrossEncoderReranker
+    agreement_k: int = 3
+    skip_overlap: float = 0.67
+    skip_margin: float = 0.25
+    shrink_overlap: float = 0.34
+    shrink_top: int = 6
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _paths: Dict[str, int] = PrivateAttr(default_factory=lambda: dict.fromkeys(PATHS, 0))
+    # mutable containers: copies made for retrieval profiles (model_copy) count into the same ones
+    _pairs: Dict[str, int] = PrivateAttr(default_factory=lambda: {"scored": 0, "saved": 0})
+
+    def _key(self, doc: Document) -> str:
+        return doc.page_content if self.ensemble.id_key is None else doc.metadata[self.ensemble.id_key]
+
+    def score_margin(self, doc_lists: List[List[Document]]) -> Optional[float]:
+        """
+        Smallest lead of #1 over #2 across the first-stage lists, as a share of each list's score
+        spread: (s1 - s2) / (s1 - s_last), from the `bm25_score` / `vector_score` the hybrid
+        retriever attaches. None when the scores are missing.
+        """
+        margins = []
+        for stage, docs in zip(STAGES, doc_lists):
+            if len(docs) < 2:
+                continue
+            scores = [doc.metadata.get(f"{stage}_score") for doc in (docs[0], docs[1], docs[-1])]
+            if any(score is None for score in scores):
+                return None
+            first, second, last = scores
+            margins.append((first - second) / (first - last) if first > last else 0.0)
+        return min(margins) if margins else None
+
+    def choose_path(self, doc_lists: List[List[Document]], fused: List[Document]) -> str:
+        """Which reranking path the first-stage results call for."""
+        lists = [lst for lst in doc_lists if lst]
+        if len(lists) < 2 or len(fused) < 2:
+            return "skip" if len(fused) <= 1 else "full"
+
+        heads_agree = len({self._key(lst[0]) for lst in lists}) == 1
+        tops = [{self._key(d) for d in lst[:self.agreement_k]} for lst in lists]
+        overlap = len(set.intersection(*tops)) / self.agreement_k
+        margin = self.score_margin(doc_lists)
+
+        if heads_agree and overlap >= self.skip_overlap and margin is not None and margin >= self.skip_margin:
+            return "skip"
+        if heads_agree or overlap >= self.shrink_overlap:
+            return "shrink"
+        return "full"
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if isinstance(self.ensemble, HybridRRFRetriever):
+            doc_lists, fused = self.ensemble.rank_lists(query)
+        else:
+            doc_lists = [
+                retriever.invoke(query, config={"callbacks": run_manager.get_child(tag=f"retriever_{i + 1}")})
+                for i, retriever in enumerate(self.ensemble.retrievers)
+            ]
+            fused = self.ensemble.weighted_reciprocal_rank(doc_lists)
+        path = self.choose_path(doc_lists, fused)
+        top_n = self.reranker.top_n
+
+        if path == "skip":
+            docs, scored = fused[:top_n], 0
+        elif path == "shrink":
+            head = fused[:self.shrink_top]
+            docs = self.reranker.compress_documents(head, query) + fused[len(head):]
+            docs, scored = docs[:top_n], len(head)
+        else:
+            docs, scored = self.reranker.compress_documents(fused, query), len(fused)
+
+        with self._lock:
+            self._paths[path] += 1
+            self._pairs["scored"] += scored
+            self._pairs["saved"] += len(fused) - scored
+        return docs
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self._paths.values())
+            return {
+                "queries": total,
+                "paths": dict(self._paths),
+                "path_rates": {p: round(n / total, 4) if total else 0.0 for p, n in self._paths.items()},
+                "pairs_scored": self._pairs["scored"],
+                "pairs_saved": self._pairs["saved"],
+            }
@@ -0,0 +1,100 @@
+import math
+from typing import Any, Dict
+
+import faiss
+import numpy as np
+
+from config import (
+    KB_INDEX_TYPE, KB_HNSW_M, KB_HNSW_EF_CONSTRUCTION, KB_HNSW_EF_SEARCH,
+    KB_IVF_NLIST, KB_IVF_NPROBE, KB_PQ_M, KB_PQ_NBITS
+)
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+
+def index_config(index_type: str = KB_INDEX_TYPE) -> Dict[str, Any]:
+    """Build-time parameters of the configured index type (part of the snapshot version)."""
+    index_type = index_type.lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+    if index_type == "hnsw":
+        return {"type": "hnsw", "m": KB_HNSW_M, "ef_construction": KB_HNSW_EF_CONSTRUCTION}
+    if index_type == "ivfpq":
+        return {"type": "ivfpq", "nlist": KB_IVF_NLIST, "pq_m": KB_PQ_M, "pq_nbits": KB_PQ_NBITS}
+    return {"type": "flat"}
+
+
+def search_params() -> Dict[str, Any]:
+    """Query-time parameters; they can change without rebuilding the index."""
+    return {"ef_search": KB_HNSW_EF_SEARCH, "nprobe": KB_IVF_NPROBE}
+
+
+def apply_search_params(index, params: Dict[str, Any]) -> None:
+    if isinstance(index, faiss.IndexHNSW) and params.get("ef_search"):
+        index.hnsw.efSearch = params["ef_search"]
+    elif isinstance(index, faiss.IndexIVF) and params.get("nprobe"):
+        index.nprobe = min(params["nprobe"], index.nlist)
+
+
+def filtered_search_params(index, ids: np.ndarray):
+    """
+    faiss SearchParameters restricting a search to the vectors `ids`, carrying the index's own
+    efSearch / nprobe (per-call parameters replace them). Keep the returned object alive as long
+    as it is used: it owns the id selector.
+    """
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(ids, dtype=np.int64))
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    elif isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    params.selector_ref = selector
+    return params
+
+
+def _pq_m(dim: int, wanted: int) -> int:
+    # number of PQ sub-quantizers must divide the vector dimension
+    for m in range(min(wanted, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_faiss_index(vectors: np.ndarray, config: Dict[str, Any]):
+    """
+    Build a FAISS index (L2 distance, like LangChain's default flat index) over `vectors`.
+
+    - flat: exact search
+    - hnsw: graph index, tuned with m / ef_construction (ef_search at query time)
+    - ivfpq: inverted lists + product quantisation, tuned with nlist / pq_m / pq_nbits
+      (nprobe at query time). nlist and pq_nbits are clamped on small corpora so training
+      has enough points per centroid.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index_type = config["type"]
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config["m"])
+        index.hnsw.efConstruction = config["ef_construction"]
+    elif index_type == "ivfpq":
+        nlist = max(1, min(config["nlist"], n // 39))
+        nbits = min(config["pq_nbits"], max(1, int(math.log2(max(n // 39, 2)))))
+        pq_m = _pq_m(dim, config["pq_m"])
+        if (nlist, nbits, pq_m) != (config["nlist"], config["pq_nbits"], config["pq_m"]):
+            print(f"[i] IVF-PQ clamped for {n} vectors: nlist={nlist}, pq_m={pq_m}, pq_nbits={nbits}")
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, nbits)
+        index.train(vectors)
+    else:
+        index = faiss.IndexFlatL2(dim)
+
+    index.add(vectors)
+    apply_search_params(index, search_params())
+    return index
+
+
+def index_memory_bytes(index) -> int:
+    """Serialized size of the index, a close proxy for its resident memory."""
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+from langchain_community.cross_encoders import BaseCrossEncoder
+from langchain_core.embeddings import Embeddings
+
+from retrieval_cache import TTLLRUCache
+
+
+class MicroBatcher:
+    """
+    Gathers work submitted from many threads and runs it through `fn` in one call.
+
+    A worker thread takes the first pending request, then keeps collecting requests for up to
+    `max_wait_ms` or until `max_batch_size` items are gathered, calls `fn(all_items)` once and
+    hands every caller back its own slice of the results.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        name: str = "micro-batcher",
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[Tuple[List[Any], Future]]" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+
+    def submit(self, items: List[Any]) -> List[Any]:
+        """Block until `items` have been processed (possibly together with other callers' items)."""
+        if not items:
+            return []
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((list(items), future))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _collect(self) -> List[Tuple[List[Any], Future]]:
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(request)
+            size += len(request[0])
+        return pending
+
+    def _run(self) -> None:
+        while True:
+            pending = self._collect()
+            batch = [item for items, _ in pending for item in items]
+            try:
+                results = list(self.fn(batch))
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for items, future in pending:
+                future.set_result(results[offset:offset + len(items)])
+                offset += len(items)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.requests += len(pending)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self.batches,
+                "requests": self.requests,
+                "items": self.items,
+                "avg_batch_items": round(self.items / self.batches, 2) if self.batches else 0.0,
+            }
+
+
+class BatchingCrossEncoder(BaseCrossEncoder):
+    """
+    Cross-encoder that scores (query, passage) pairs of concurrent rerank calls in shared
+    forward passes instead of one small pass per request thread.
+    Drop-in for CrossEncoderReranker(model=...).
+    """
+
+    def __init__(self, cross_encoder: BaseCrossEncoder, max_batch_size: int = 128, max_wait_ms: float = 5.0):
+        self.cross_encoder = cross_encoder
+        self.batcher = MicroBatcher(
+            lambda pairs: list(self.cross_encoder.score(pairs)),
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name="rerank-batcher",
+        )
+
+    def score(self, text_pairs: List[Tuple[str, str]]) -> List[float]:
+        return self.batcher.submit(text_pairs)
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Query-embedding service in front of an Embeddings model, shared by every retrieval caller
+    (FAISS search, the semantic answer cache, ...).
+
+    - embed_query: served from a small query -> vector LRU, otherwise queued and encoded
+      together with concurrent queries in one embed_documents call
+    - embed_documents: bulk indexing calls go straight to the model
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 3.0,
+        cache_size: int = 1024,
+    ):
+        self.embeddings = embeddings
+        self.cache = TTLLRUCache(maxsize=cache_size)
+        self.batcher = MicroBatcher(
+            self.embeddings.embed_documents,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name="embed-batcher",
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = self.batcher.submit([text])[0]
+            self.cache.put(text, vector)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cache": self.cache.stats(), "batching": self.batcher.stats()}
@@ -0,0 +1,113 @@
+"""
+Recall@k / latency / memory report of the FAISS index types (flat, hnsw, ivfpq) on the
+current knowledge base. The flat index is the exact ground truth.
+
+    python -m benchmarks.ann_report --k 10 --markdown ann_report.md
+    python -m benchmarks.ann_report --replicate 50   # simulate a ~50x larger corpus
+
+Index parameters come from config (KB_HNSW_*, KB_IVF_*, KB_PQ_*).
+"""
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from ann_index import INDEX_TYPES, build_faiss_index, index_config, index_memory_bytes
+from config import KB_DIR
+from knowledge_base import load_documents, load_models
+
+QUERIES = [
+    "what time do you close",
+    "are your dishes halal",
+    "do you deliver to gulshan",
+    "how much is the royal lamb mandi",
+    "which bank discounts do you have",
+    "is there a kids play area",
+    "do you have vegan options",
+    "what is your refund policy",
+    "what payment methods do you accept",
+    "can I bring my dog",
+]
+
+
+def evaluate(index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    latencies = []
+    found = []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+    latencies.sort()
+    return {
+        f"recall@{k}": round(float(recall), 4),
+        "p50_us": round(statistics.median(latencies) * 1e6, 1),
+        "p95_us": round(latencies[int(0.95 * (len(latencies) - 1))] * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--replicate", type=int, default=1, help="add noisy copies of every chunk vector")
+    parser.add_argument("--markdown", help="also write the report as a markdown table to this path")
+    parser.add_argument("--json", action="store_true", help="print a single JSON object")
+    args = parser.parse_args()
+
+    embeddings, _ = load_models()
+    docs = load_documents(str(KB_DIR))
+    vectors = np.asarray(embeddings.embed_documents([d.page_content for d in docs]), dtype=np.float32)
+    queries = np.asarray([embeddings.embed_query(q) for q in QUERIES], dtype=np.float32)
+
+    rng = np.random.default_rng(0)
+    if args.replicate > 1:
+        noise = rng.normal(scale=0.02, size=(vectors.shape[0] * (args.replicate - 1), vectors.shape[1]))
+        vectors = np.vstack([vectors, np.tile(vectors, (args.replicate - 1, 1)) + noise.astype(np.float32)])
+    # chunk vectors as extra queries so the recall estimate isn't driven by ten questions
+    sample = vectors[rng.choice(len(vectors), size=min(200, len(vectors)), replace=False)]
+    queries = np.vstack([queries, sample])
+    k = min(args.k, len(vectors))
+
+    results = {}
+    truth = None
+    for index_type in INDEX_TYPES:
+        spec = index_config(index_type)
+        start = time.perf_counter()
+        index = build_faiss_index(vectors, spec)
+        build_s = time.perf_counter() - start
+        if truth is None:   # flat comes first
+            _, truth = index.search(queries, k)
+        results[index_type] = {
+            "params": spec,
+            "build_s": round(build_s, 3),
+            "memory_bytes": index_memory_bytes(index),
+            **evaluate(index, queries, truth, k),
+        }
+
+    report = {"vectors": int(len(vectors)), "dim": int(vectors.shape[1]), "queries": int(len(queries)), "k": k,
+              "indexes": results}
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    lines = [
+        f"Corpus: {report['vectors']} vectors x {report['dim']} dims, {report['queries']} queries, k={k}",
+        "",
+        f"| index | recall@{k} | p50 (us) | p95 (us) | memory (KiB) | build (s) |",
+        "|---|---|---|---|---|---|",
+    ]
+    for name, r in results.items():
+        lines.append(f"| {name} | {r[f'recall@{k}']} | {r['p50_us']} | {r['p95_us']} | "
+                     f"{r['memory_bytes'] / 1024:.1f} | {r['build_s']} |")
+    text = "\n".join(lines)
+    print(text)
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Ranking parity + speedup of an ONNX / int8 backend against the PyTorch models on the bundled
+knowledge base and the labelled questions of benchmarks/questions.json.
+
+    python -m benchmarks.backend_parity --backend onnx-int8
+    python -m benchmarks.backend_parity --backend onnx --k 5 --json
+
+Embedder: cosine between torch and candidate chunk vectors, top-k overlap / top-1 agreement of
+exact search over the chunks, encode time. Reranker: Spearman correlation of the scores over
+the top-20 torch candidates, top-k overlap / top-1 agreement of the reranked order, score time.
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from scipy.stats import spearmanr
+
+from config import (
+    KB_DIR, EMBEDDING_MODEL_ID, EMBEDDING_MODEL_DIR, RERANKER_MODEL_ID, RERANKER_MODEL_DIR
+)
+from get_models import ONNX_BACKENDS
+from knowledge_base import load_documents, load_hf_model
+
+QUESTIONS_FILE = Path(__file__).with_name("questions.json")
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def normalized(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def overlap(a, b, k: int) -> float:
+    return len(set(a[:k]) & set(b[:k])) / k
+
+
+def compare_embeddings(reference, candidate, texts, queries, k: int) -> dict:
+    ref_docs, ref_doc_s = timed(reference.embed_documents, texts)
+    cand_docs, cand_doc_s = timed(candidate.embed_documents, texts)
+    ref_docs, cand_docs = normalized(ref_docs), normalized(cand_docs)
+    ref_q, ref_q_s = timed(lambda qs: [reference.embed_query(q) for q in qs], queries)
+    cand_q, cand_q_s = timed(lambda qs: [candidate.embed_query(q) for q in qs], queries)
+    ref_rank = np.argsort(-(normalized(ref_q) @ ref_docs.T), axis=1)
+    cand_rank = np.argsort(-(normalized(cand_q) @ cand_docs.T), axis=1)
+
+    cosine = np.sum(ref_docs * cand_docs, axis=1)
+    return {
+        "vector_cosine_mean": round(float(cosine.mean()), 5),
+        "vector_cosine_min": round(float(cosine.min()), 5),
+        f"top{k}_overlap": round(statistics.mean(overlap(r, c, k) for r, c in zip(ref_rank, cand_rank)), 4),
+        "top1_agreement": round(float(np.mean(ref_rank[:, 0] == cand_rank[:, 0])), 4),
+        "documents_speedup": round(ref_doc_s / cand_doc_s, 2),
+        "queries_speedup": round(ref_q_s / cand_q_s, 2),
+        "documents_s": {"torch": round(ref_doc_s, 3), "candidate": round(cand_doc_s, 3)},
+        "queries_s": {"torch": round(ref_q_s, 3), "candidate": round(cand_q_s, 3)},
+    }, ref_rank
+
+
+def compare_rerankers(reference, candidate, texts, queries, candidates, k: int) -> dict:
+    rhos, overlaps, top1 = [], [], []
+    ref_s = cand_s = 0.0
+    for query, ids in zip(queries, candidates):
+        pairs = [(query, texts[i]) for i in ids]
+        ref_scores, t_ref = timed(lambda p: np.asarray(list(reference.score(p)), dtype=np.float32), pairs)
+        cand_scores, t_cand = timed(lambda p: np.asarray(list(candidate.score(p)), dtype=np.float32), pairs)
+        ref_s, cand_s = ref_s + t_ref, cand_s + t_cand
+        rhos.append(spearmanr(ref_scores, cand_scores).statistic)
+        ref_order, cand_order = np.argsort(-ref_scores), np.argsort(-cand_scores)
+        overlaps.append(overlap(ref_order, cand_order, k))
+        top1.append(ref_order[0] == cand_order[0])
+    return {
+        "spearman_mean": round(float(np.nanmean(rhos)), 4),
+        "spearman_min": round(float(np.nanmin(rhos)), 4),
+        f"top{k}_overlap": round(statistics.mean(overlaps), 4),
+        "top1_agreement": round(float(np.mean(top1)), 4),
+        "speedup": round(ref_s / cand_s, 2),
+        "score_s": {"torch": round(ref_s, 3), "candidate": round(cand_s, 3)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="onnx-int8", choices=ONNX_BACKENDS)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=20, help="chunks reranked per question")
+    parser.add_argument("--json", action="store_true", help="print a single JSON object")
+    args = parser.parse_args()
+
+    texts = [d.page_content for d in load_documents(str(KB_DIR))]
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as fh:
+        queries = [q["question"] for q in json.load(fh)]
+
+    torch_embeddings = load_hf_model(HuggingFaceEmbeddings, EMBEDDING_MODEL_ID, EMBEDDING_MODEL_DIR, "torch")
+    cand_embeddings = load_hf_model(
+        HuggingFaceEmbeddings, EMBEDDING_MODEL_ID, EMBEDDING_MODEL_DIR, args.backend, "embedding"
+    )
+    torch_reranker = load_hf_model(HuggingFaceCrossEncoder, RERANKER_MODEL_ID, RERANKER_MODEL_DIR, "torch")
+    cand_reranker = load_hf_model(
+        HuggingFaceCrossEncoder, RERANKER_MODEL_ID, RERANKER_MODEL_DIR, args.backend, "cross-encoder"
+    )
+    fell_back = [name for name, model in (("embedder", cand_embeddings), ("reranker", cand_reranker))
+                 if not model.model_kwargs.get("backend")]
+
+    embedding_report, ref_rank = compare_embeddings(torch_embeddings, cand_embeddings, texts, queries, args.k)
+    candidates = [row[:args.candidates] for row in ref_rank]
+    rerank_report = compare_rerankers(torch_reranker, cand_reranker, texts, queries, candidates, args.k)
+
+    report = {"backend": args.backend, "fell_back_to_torch": fell_back, "chunks": len(texts),
+              "queries": len(queries), "k": args.k, "embedder": embedding_report, "reranker": rerank_report}
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    k = args.k
+    print(f"Backend {args.backend} vs torch: {len(texts)} chunks, {len(queries)} questions, k={k}")
+    if fell_back:
+        print(f"[!] {', '.join(fell_back)} fell back to torch, the comparison is torch vs torch")
+    print()
+    print(f"| model | top-{k} overlap | top-1 agreement | parity | speedup |")
+    print("|---|---|---|---|---|")
+    e, r = embedding_report, rerank_report
+    print(f"| embedder | {e[f'top{k}_overlap']} | {e['top1_agreement']} | cosine {e['vector_cosine_mean']} "
+          f"(min {e['vector_cosine_min']}) | docs {e['documents_speedup']}x, queries {e['queries_speedup']}x |")
+    print(f"| reranker | {r[f'top{k}_overlap']} | {r['top1_agreement']} | spearman {r['spearman_mean']} "
+          f"(min {r['spearman_min']}) | {r['speedup']}x |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+BM25 query latency as the corpus grows: rank_bm25 (langchain's BM25Retriever backend, one
+Python loop per query) vs. the sparse BM25Index used by the snapshots.
+
+The knowledge base chunks are replicated to simulate larger corpora; every copy gets a unique
+token so the vocabulary grows with the corpus as well.
+
+    python -m benchmarks.bm25_scaling --sizes 1 10 100 --k 5
+"""
+import argparse
+import json
+import statistics
+import time
+
+from rank_bm25 import BM25Okapi
+
+from bm25_index import BM25Index, default_preprocessing_func
+from config import KB_DIR
+from knowledge_base import load_documents
+
+QUERIES = [
+    "what time do you close",
+    "are your dishes halal",
+    "do you deliver to gulshan",
+    "how much is the Royal Lamb Mandi",
+    "which bank discounts do you have",
+    "is there a kids play area",
+    "do you have vegan options",
+    "what is your refund policy",
+]
+
+
+def time_queries(search, queries, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        for q in queries:
+            start = time.perf_counter()
+            search(q)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1e3, 3),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1e3, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="corpus replication factors")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    base = [default_preprocessing_func(d.page_content) for d in load_documents(str(KB_DIR))]
+    queries = [default_preprocessing_func(q) for q in QUERIES]
+
+    rows = []
+    for factor in args.sizes:
+        corpus = [tokens + [f"copy{c}"] for c in range(factor) for tokens in base]
+
+        start = time.perf_counter()
+        reference = BM25Okapi(corpus)
+        rank_bm25_build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        index = BM25Index.from_tokens(corpus)
+        sparse_build_s = time.perf_counter() - start
+
+        doc_ids = list(range(len(corpus)))
+        rows.append({
+            "chunks": len(corpus),
+            "vocab": len(index.vocab),
+            "rank_bm25": {"build_s": round(rank_bm25_build_s, 3),
+                          **time_queries(lambda q: reference.get_top_n(q, doc_ids, n=args.k), queries, args.repeat)},
+            "sparse": {"build_s": round(sparse_build_s, 3),
+                       **time_queries(lambda q: index.top_n(q, args.k), queries, args.repeat)},
+        })
+        print(json.dumps(rows[-1]))
+
+    print()
+    print("| chunks | rank_bm25 p50 (ms) | sparse p50 (ms) | speedup |")
+    print("|---|---|---|---|")
+    for r in rows:
+        speedup = r["rank_bm25"]["p50_ms"] / max(r["sparse"]["p50_ms"], 1e-6)
+        print(f"| {r['chunks']} | {r['rank_bm25']['p50_ms']} | {r['sparse']['p50_ms']} | {speedup:.1f}x |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Per-worker heap taken by the knowledge-base chunks as the knowledge base grows: Document lists
+(one per component, the old layout) vs. the single chunk store every component references by id.
+
+- before: app.state.docs, the unpickled FAISS InMemoryDocstore and BM25's document list, each
+  a list of Documents with its own strings and metadata dicts
+- after: the registry's per-PDF chunks packed in memory (ChunkStore.from_documents, kept for
+  incremental refresh) + the snapshot's memory-mapped chunk store, whose pages sit once in the
+  page cache for all workers (reported separately)
+
+Heap is measured with tracemalloc. The knowledge base chunks are replicated `--copies` times:
+
+    python -m benchmarks.chunk_memory --copies 1 10 100
+    python -m benchmarks.chunk_memory --json
+"""
+import argparse
+import contextlib
+import json
+import pickle
+import sys
+import tempfile
+import tracemalloc
+import uuid
+from typing import Callable, List
+
+from langchain_core.documents import Document
+
+MB = 2**20
+
+
+def heap_mb(build: Callable[[], object]) -> float:
+    """Heap still allocated by `build()`'s result once it returns."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return round(used / MB, 2)
+
+
+def documents(docs: List[Document]) -> List[Document]:
+    # pickling gives every Document its own strings and dicts, as an unpickled docstore has
+    return pickle.loads(pickle.dumps(docs))
+
+
+def before_layout(docs: List[Document]):
+    app_state_docs = documents(docs)
+    faiss_docstore = {str(uuid.uuid4()): d for d in documents(docs)}
+    bm25_docs = documents(docs)
+    return app_state_docs, faiss_docstore, bm25_docs
+
+
+def after_layout(docs: List[Document], snapshot_dir: str):
+    from chunk_store import ChunkStore
+
+    packed_by_file = ChunkStore.from_documents(docs)
+    snapshot_store = ChunkStore.open(snapshot_dir, mmap=True)
+    return packed_by_file, snapshot_store
+
+
+def measure(base: List[Document], copies: int) -> dict:
+    from chunk_store import ChunkStore, write_chunk_store
+
+    docs = [
+        Document(page_content=f"{d.page_content} copy{c}", metadata=dict(d.metadata))
+        for c in range(copies) for d in base
+    ]
+    with tempfile.TemporaryDirectory(prefix="chunk_memory_") as snapshot_dir:
+        write_chunk_store(snapshot_dir, docs)
+        before = heap_mb(lambda: before_layout(docs))
+        after = heap_mb(lambda: after_layout(docs, snapshot_dir))
+        shared = round(ChunkStore.open(snapshot_dir).nbytes / MB, 2)
+    return {
+        "copies": copies,
+        "chunks": len(docs),
+        "text_mb": round(sum(len(d.page_content.encode("utf-8")) for d in docs) / MB, 2),
+        "before_heap_mb": before,
+        "after_heap_mb": after,
+        "shared_mmap_mb": shared,
+        "saving_pct": round(100 * (1 - after / before), 1) if before else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 10, 100], help="replicas of the knowledge base")
+    parser.add_argument("--json", action="store_true", help="print a single JSON object")
+    args = parser.parse_args()
+
+    from config import KB_DIR
+    from knowledge_base import load_documents
+
+    with contextlib.redirect_stdout(sys.stderr):
+        base = load_documents(str(KB_DIR))
+    rows = [measure(base, copies) for copies in args.copies]
+
+    if args.json:
+        print(json.dumps({"results": rows}))
+        return
+
+    print("Heap per worker taken by the chunks (tracemalloc), before / after the shared chunk store")
+    print()
+    print("| copies | chunks | text MB | before MB | after MB | saving | shared mmap MB |")
+    print("|---|---|---|---|---|---|---|")
+    for r in rows:
+        print(f"| {r['copies']} | {r['chunks']} | {r['text_mb']} | {r['before_heap_mb']} | {r['after_heap_mb']} "
+              f"| {r['saving_pct']}% | {r['shared_mmap_mb']} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-call overhead of QueryRun.execute_query before the chat model is reached, for every prompt
+class: rebuilding the ChatPromptTemplate, the prompt | chat_model | parser chain and the
+parser's format instructions on every call (old behaviour) vs. the chain compiled once per
+class. Both sides then render the prompt for the same inputs; the chat model is never called.
+
+    python -m benchmarks.query_run_overhead
+    python -m benchmarks.query_run_overhead --repeat 500 --json
+"""
+import argparse
+import inspect
+import json
+import statistics
+import time
+
+import prompt_templates
+from query_run import QueryRun
+
+INPUTS = {
+    "query": "I want two Royal Lamb Mandi and a mint tea",
+    "conversation_history": "user: hi\nassistant: Welcome to Al-Buraq, how can I help?",
+    "context": "Royal Lamb Mandi - PKR 4,500\nMoroccan Mint Tea - PKR 650",
+    "order": "{}",
+    "customer": "{}",
+    "booking": "{}",
+    "current_complaint": "",
+    "current_date": "2025-01-01",
+}
+
+
+def per_call_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1e3, 4)
+
+
+def measure(cls, repeat: int) -> dict:
+    def uncached():
+        # what execute_query did on every call before the chain was cached
+        chain = cls.build_chain(cls.output_parser)
+        chain.first.invoke(INPUTS)
+
+    cached_prompt = cls.chain().first
+
+    def cached():
+        cached_prompt.invoke(INPUTS)
+
+    out = {
+        "class": cls.__name__,
+        "structured": cls.output_parser is not None,
+        "uncached_ms": per_call_ms(uncached, repeat),
+        "cached_ms": per_call_ms(cached, repeat),
+    }
+    if cls.output_parser is not None:
+        out["format_instructions_ms"] = per_call_ms(cls.output_parser.get_format_instructions, repeat)
+    out["saved_ms"] = round(out["uncached_ms"] - out["cached_ms"], 4)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="calls per class (median is reported)")
+    parser.add_argument("--json", action="store_true", help="print a single JSON object")
+    args = parser.parse_args()
+
+    classes = [
+        cls for _, cls in inspect.getmembers(prompt_templates, inspect.isclass)
+        if issubclass(cls, QueryRun) and cls is not QueryRun
+    ]
+    rows = [measure(cls, args.repeat) for cls in classes]
+
+    if args.json:
+        print(json.dumps({"repeat": args.repeat, "results": rows}))
+        return
+
+    print(f"Median per-call overhead before the chat model, {args.repeat} calls per class")
+    print()
+    print("| class | structured | rebuilt per call ms | compiled once ms | saved ms | format instructions ms |")
+    print("|---|---|---|---|---|---|")
+    for r in rows:
+        print(f"| {r['class']} | {'yes' if r['structured'] else 'no'} | {r['uncached_ms']} | {r['cached_ms']} "
+              f"| {r['saved_ms']} | {r.get('format_instructions_ms', '-')} |")
+    print()
+    print(f"mean saved per call: {statistics.mean(r['saved_ms'] for r in rows):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
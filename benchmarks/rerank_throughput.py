@@ -0,0 +1,101 @@
+"""
+Reranker throughput under concurrent load: one cross-encoder call per request thread
+(current path) vs. BatchingCrossEncoder sharing forward passes between threads.
+
+    python -m benchmarks.rerank_throughput --threads 8 --requests 64 --candidates 25
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+
+from batching import BatchingCrossEncoder
+from config import KB_DIR, RERANKER_MODEL_ID, RERANKER_MODEL_DIR
+from get_models import ensure_model_dir
+from knowledge_base import load_documents
+
+QUERIES = [
+    "what time do you close",
+    "are your dishes halal",
+    "do you deliver to gulshan",
+    "how much is the royal lamb mandi",
+    "which bank discounts do you have",
+    "is there parking at clifton",
+    "do you have vegan options",
+    "what is your refund policy",
+]
+
+
+def run(cross_encoder, workload, threads: int) -> dict:
+    latencies = []
+
+    def one(pairs):
+        start = time.perf_counter()
+        cross_encoder.score(pairs)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, workload))
+    elapsed = time.perf_counter() - start
+
+    pairs = sum(len(p) for p in workload)
+    latencies.sort()
+    return {
+        "requests": len(workload),
+        "pairs": pairs,
+        "seconds": round(elapsed, 3),
+        "pairs_per_second": round(pairs / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--candidates", type=int, default=25, help="passages per rerank call")
+    parser.add_argument("--max-batch-size", type=int, default=128)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--json", action="store_true", help="print a single JSON object")
+    args = parser.parse_args()
+
+    reranker_local, _ = ensure_model_dir(RERANKER_MODEL_ID, RERANKER_MODEL_DIR)
+    base = HuggingFaceCrossEncoder(model_name=str(reranker_local))
+    passages = [d.page_content for d in load_documents(str(KB_DIR))]
+
+    rng = random.Random(0)
+    workload = []
+    for i in range(args.requests):
+        query = QUERIES[i % len(QUERIES)]
+        sample = rng.sample(passages, min(args.candidates, len(passages)))
+        workload.append([(query, p) for p in sample])
+
+    # warm-up so model initialisation is not measured
+    base.score(workload[0])
+
+    batched = BatchingCrossEncoder(base, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    report = {
+        "threads": args.threads,
+        "direct": run(base, workload, args.threads),
+        "batched": run(batched, workload, args.threads),
+        "batcher": batched.batcher.stats(),
+    }
+    report["speedup"] = round(report["batched"]["pairs_per_second"] / report["direct"]["pairs_per_second"], 2)
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    for name in ("direct", "batched"):
+        r = report[name]
+        print(f"{name:8s} {r['pairs_per_second']:>9.1f} pairs/s  p50 {r['p50_ms']:>7.1f} ms  p95 {r['p95_ms']:>7.1f} ms")
+    print(f"speedup  x{report['speedup']}  (avg batch {report['batcher']['avg_batch_items']} pairs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Retrieval quality + latency benchmark on knowledge_base/ with a labelled question set.
+
+For every variant (FAISS index type x reranking mode) it reports recall@k and MRR of each
+stage's ranking (BM25, FAISS, RRF fusion, rerank, end-to-end retriever) and p50/p95/p99
+latency per stage, plus ingestion time and peak RSS. Output is one JSON document tagged with
+the git commit, so runs can be diffed across commits:
+
+    python -m benchmarks.retrieval_eval --output eval.json
+    python -m benchmarks.retrieval_eval --index-types flat hnsw --modes full adaptive --k 1 3 5
+
+A chunk is relevant to a question when it contains one of the question's `relevant` snippets
+(case-insensitive), so labels survive re-chunking.
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from adaptive_rerank import AdaptiveRerankRetriever
+from ann_index import INDEX_TYPES, index_config
+from batching import BatchingEmbeddings
+from hybrid_retriever import HybridRRFRetriever, rrf_fuse
+from config import KB_DIR
+from kb_snapshot import build_indexes
+from knowledge_base import assemble_retriever, embedding_model_key, load_documents, load_models
+
+QUESTIONS_FILE = Path(__file__).with_name("questions.json")
+REPO_DIR = Path(__file__).resolve().parent.parent
+MODES = ("full", "adaptive", "none")    # reranking: always, adaptive, fusion only
+STAGES = ("bm25", "faiss", "fusion", "rerank", "end_to_end")
+
+
+def git_commit() -> Dict[str, object]:
+    def git(*cmd: str) -> str:
+        return subprocess.check_output(["git", *cmd], cwd=REPO_DIR, text=True, stderr=subprocess.DEVNULL).strip()
+
+    try:
+        commit = git("rev-parse", "HEAD")
+        dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1e3, 3)
+
+    return {"p50_ms": round(statistics.median(ordered) * 1e3, 3), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def rank_metrics(ranked: List[str], relevant: set, ks: List[int]) -> Dict[str, float]:
+    """recall@k (share of relevant chunks found in the top k) and reciprocal rank of the first hit."""
+    out = {f"recall@{k}": len(relevant & set(ranked[:k])) / len(relevant) for k in ks}
+    out["rr"] = next((1.0 / rank for rank, key in enumerate(ranked, start=1) if key in relevant), 0.0)
+    return out
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run_variant(index_type: str, mode: str, docs, embeddings, cross_encoder, questions, ks, repeat) -> dict:
+    start = time.perf_counter()
+    vector_store, bm25_retriever, version = build_indexes(
+        docs, embeddings, str(KB_DIR), embedding_model_key(embeddings), bm25_k=5, index_spec=index_config(index_type)
+    )
+    retriever = assemble_retriever(vector_store, bm25_retriever, cross_encoder, adaptive=(mode == "adaptive"))
+    index_s = time.perf_counter() - start
+
+    # the stages exactly as setup_retriever wires them
+    if isinstance(retriever, AdaptiveRerankRetriever):
+        ensemble, reranker = retriever.ensemble, retriever.reranker
+    else:
+        ensemble, reranker = retriever.base_retriever, retriever.base_compressor
+    if isinstance(ensemble, HybridRRFRetriever):
+        def bm25_stage(query):
+            ids, scores = ensemble.bm25_search(query)
+            return ensemble.to_documents(ids, {"bm25": (ids, scores)})
+
+        def faiss_stage(query):
+            ids, scores = ensemble.vector_search(query)
+            return ensemble.to_documents(ids, {"vector": (ids, scores)})
+
+        def fuse(doc_lists):
+            ids, scores = rrf_fuse([[d.metadata[ensemble.id_key] for d in lst] for lst in doc_lists],
+                                   ensemble.weights, ensemble.c)
+            return ensemble.to_documents(ids, rrf_scores=scores)
+    else:
+        bm25_stage, faiss_stage = (r.invoke for r in ensemble.retrievers)
+        fuse = ensemble.weighted_reciprocal_rank
+
+    latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    scores: Dict[str, List[Dict[str, float]]] = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        if isinstance(embeddings, BatchingEmbeddings):
+            embeddings.cache.clear()    # time query embedding, not the query cache
+        for q in questions:
+            bm25_docs, t_bm25 = timed(bm25_stage, q["question"])
+            faiss_docs, t_faiss = timed(faiss_stage, q["question"])
+            fused, t_fusion = timed(fuse, [bm25_docs, faiss_docs])
+            reranked, t_rerank = timed(reranker.compress_documents, fused, q["question"])
+            if mode == "none":
+                final, t_final = timed(ensemble.invoke, q["question"])
+            else:
+                final, t_final = timed(retriever.invoke, q["question"])
+
+            ranked = {"bm25": bm25_docs, "faiss": faiss_docs, "fusion": fused, "rerank": reranked, "end_to_end": final}
+            timings = {"bm25": t_bm25, "faiss": t_faiss, "fusion": t_fusion, "rerank": t_rerank, "end_to_end": t_final}
+            for stage in STAGES:
+                latencies[stage].append(timings[stage])
+                scores[stage].append(rank_metrics([d.page_content for d in ranked[stage]], q["relevant_keys"], ks))
+
+    stages = {}
+    for stage in STAGES:
+        metrics = {name: round(statistics.mean(s[name] for s in scores[stage]), 4) for name in scores[stage][0]}
+        metrics["mrr"] = metrics.pop("rr")
+        stages[stage] = {**metrics, **percentiles(latencies[stage])}
+
+    result = {"index_type": index_type, "mode": mode, "kb_version": version,
+              "index_build_or_load_s": round(index_s, 3), "stages": stages, "peak_rss_mb": peak_rss_mb()}
+    if isinstance(retriever, AdaptiveRerankRetriever):
+        result["adaptive_rerank"] = retriever.stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=str(QUESTIONS_FILE))
+    parser.add_argument("--index-types", nargs="+", default=["flat"], choices=INDEX_TYPES)
+    parser.add_argument("--modes", nargs="+", default=["full", "adaptive"], choices=MODES)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the question set (latency samples)")
+    parser.add_argument("--output", help="also write the JSON report to this path")
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as fh:
+        questions = json.load(fh)
+
+    # progress logging of the ingestion / index code goes to stderr, stdout is the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        embeddings, cross_encoder = load_models()
+        docs, ingest_s = timed(load_documents, str(KB_DIR))
+        for q in questions:
+            needles = [s.lower() for s in q["relevant"]]
+            q["relevant_keys"] = {d.page_content for d in docs if any(n in d.page_content.lower() for n in needles)}
+        unlabelled = [q["question"] for q in questions if not q["relevant_keys"]]
+        if unlabelled:
+            print(f"[!] No chunk matches the labels of {len(unlabelled)} questions, skipping: {unlabelled}")
+            questions = [q for q in questions if q["relevant_keys"]]
+
+        variants = [
+            run_variant(index_type, mode, docs, embeddings, cross_encoder, questions, args.k, args.repeat)
+            for index_type in args.index_types
+            for mode in args.modes
+        ]
+    report = {
+        **git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "embedding_model": embedding_model_key(embeddings),
+        "questions": len(questions),
+        "chunks": len(docs),
+        "ingest_s": round(ingest_s, 3),
+        "repeat": args.repeat,
+        "variants": variants,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+
+    # short human summary on stderr so stdout stays valid JSON
+    k = max(args.k)
+    for v in variants:
+        e2e = v["stages"]["end_to_end"]
+        print(f"[i] {v['index_type']}/{v['mode']}: recall@{k}={e2e[f'recall@{k}']} mrr={e2e['mrr']} "
+              f"p95={e2e['p95_ms']}ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Per-worker memory of the retrieval indexes with N worker processes, snapshot read into every
+worker's heap (KB_MMAP=0, the old layout's behaviour) vs. memory-mapped (KB_MMAP=1).
+
+Each worker loads the same snapshot, runs FAISS + BM25 queries and reports, once all workers
+are loaded, its RSS, PSS (shared pages split between the processes that map them) and private
+memory from /proc/self/smaps_rollup (Linux only), minus what it used before loading.
+
+The knowledge base chunks are replicated `--copies` times with random 768-d vectors, so no
+embedding model is needed and the effect is visible at a realistic corpus size:
+
+    python -m benchmarks.worker_memory --workers 4 --copies 200
+    python -m benchmarks.worker_memory --workers 1 2 4 --copies 100 --json
+"""
+import argparse
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# the indexes are queried by vector here, there is no embedder to hand to the FAISS store
+logging.getLogger("langchain_community.vectorstores.faiss").setLevel(logging.ERROR)
+
+QUERIES = [
+    "what time do you close",
+    "are your dishes halal",
+    "how much is the Royal Lamb Mandi",
+    "which bank discounts do you have",
+]
+
+
+def memory_mb() -> dict:
+    fields = {}
+    with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "private": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def worker(version: str, mmap: bool, dim: int, loaded, results) -> None:
+    from kb_snapshot import load_snapshot
+
+    before = memory_mb()
+    vector_store, bm25_retriever, chunks = load_snapshot(version, embeddings=None, mmap=mmap)
+    rng = np.random.default_rng(os.getpid())
+    for q in QUERIES:
+        _, ids = vector_store.index.search(rng.standard_normal((1, dim)).astype(np.float32), 10)
+        [chunks[int(i)] for i in ids[0] if i >= 0]
+        bm25_retriever.invoke(q)
+    loaded.wait()   # every worker has its snapshot mapped before PSS is read
+    after = memory_mb()
+    results.put({k: round(after[k] - before[k], 1) for k in after})
+    loaded.wait()   # keep the mappings alive until every worker has measured
+
+
+def build_synthetic_snapshot(copies: int, dim: int) -> str:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    from ann_index import build_faiss_index, index_config
+    from bm25_index import SparseBM25Retriever
+    from config import KB_DIR
+    from kb_snapshot import save_snapshot
+    from knowledge_base import load_documents
+
+    base = load_documents(str(KB_DIR))
+    docs = [
+        Document(page_content=f"{d.page_content} copy{c}", metadata=d.metadata)
+        for c in range(copies) for d in base
+    ]
+    vectors = np.random.default_rng(0).standard_normal((len(docs), dim)).astype(np.float32)
+    vector_store = FAISS(embedding_function=None, index=build_faiss_index(vectors, index_config()),
+                         docstore=None, index_to_docstore_id={})
+    bm25 = SparseBM25Retriever.from_texts([d.page_content for d in docs], metadatas=[d.metadata for d in docs])
+    version = f"synthetic-{copies}"
+    save_snapshot(version, "synthetic", {}, docs, vectors, vector_store, bm25, index_config())
+    return version
+
+
+def measure(version: str, workers: int, mmap: bool, dim: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    loaded, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(version, mmap, dim, loaded, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    samples = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    per_worker = {k: round(sum(s[k] for s in samples) / workers, 1) for k in samples[0]}
+    return {"mode": "mmap" if mmap else "heap", "workers": workers, "per_worker_mb": per_worker,
+            "total_pss_mb": round(per_worker["pss"] * workers, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--copies", type=int, default=100, help="replicas of the knowledge base chunks")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--json", action="store_true", help="print a single JSON object")
+    args = parser.parse_args()
+
+    # snapshots of this run go to a scratch directory, inherited by the spawned workers
+    os.environ["KB_SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="worker_memory_")
+    with contextlib.redirect_stdout(sys.stderr):
+        version = build_synthetic_snapshot(args.copies, args.dim)
+    rows = [measure(version, n, mmap, args.dim) for n in args.workers for mmap in (False, True)]
+
+    if args.json:
+        print(json.dumps({"copies": args.copies, "dim": args.dim, "results": rows}))
+        return
+
+    print(f"Snapshot {version}: KB x{args.copies}, {args.dim}-d vectors; memory added by loading it, per worker")
+    print()
+    print("| mode | workers | RSS MB | PSS MB | private MB | total PSS MB |")
+    print("|---|---|---|---|---|---|")
+    for r in rows:
+        m = r["per_worker_mb"]
+        print(f"| {r['mode']} | {r['workers']} | {m['rss']} | {m['pss']} | {m['private']} | {r['total_pss_mb']} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Vectorised BM25 (Okapi) keyword search over a sparse term-document matrix.
+
+Scores match rank_bm25.BM25Okapi (same k1 / b / epsilon IDF floor), but every per-document
+BM25 weight is precomputed once into a CSR matrix, so a query is a sparse row gather + a dot
+product instead of a Python loop over every chunk. The index saves to a directory of .npy
+files that can be memory-mapped.
+"""
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, Field
+from scipy import sparse
+
+
+def default_preprocessing_func(text: str) -> List[str]:
+    # same tokenisation as langchain's BM25Retriever
+    return text.split()
+
+
+class BM25Index:
+    """
+    weights[t, d] = idf(t) * tf(t, d) * (k1 + 1) / (tf(t, d) + k1 * (1 - b + b * len(d) / avgdl))
+    stored term-major (one CSR row per vocabulary term), so a query only touches its own terms.
+    """
+
+    def __init__(self, weights: sparse.csr_matrix, vocab: Dict[str, int]):
+        self.weights = weights
+        self.vocab = vocab
+
+    @property
+    def n_docs(self) -> int:
+        return self.weights.shape[1]
+
+    @classmethod
+    def from_tokens(
+        cls,
+        corpus: List[List[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        doc_len = np.zeros(len(corpus), dtype=np.float64)
+        for d, tokens in enumerate(corpus):
+            doc_len[d] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                rows.append(vocab.setdefault(term, len(vocab)))
+                cols.append(d)
+                counts.append(tf)
+
+        tf = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float64), (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64))),
+            shape=(len(vocab), len(corpus)),
+        )
+        if not vocab:
+            return cls(tf.astype(np.float32), vocab)
+
+        # IDF with rank_bm25's floor: negative idfs become epsilon * mean idf
+        n = len(corpus)
+        df = np.diff(tf.indptr).astype(np.float64)
+        idf = np.log(n - df + 0.5) - np.log(df + 0.5)
+        idf[idf < 0] = epsilon * idf.mean()
+
+        avgdl = doc_len.sum() / n
+        norm = k1 * (1 - b + b * doc_len / avgdl)
+        term_of_entry = np.repeat(np.arange(len(vocab)), np.diff(tf.indptr))
+        tf_data = tf.data
+        tf.data = idf[term_of_entry] * tf_data * (k1 + 1) / (tf_data + norm[tf.indices])
+        return cls(tf.astype(np.float32), vocab)
+
+    def get_scores(self, tokens: Iterable[str]) -> np.ndarray:
+        """BM25 score of every document; repeated query terms count once per occurrence."""
+        counts = Counter(t for t in tokens if t in self.vocab)
+        if not counts:
+            return np.zeros(self.n_docs, dtype=np.float32)
+        term_ids = np.fromiter((self.vocab[t] for t in counts), dtype=np.int64, count=len(counts))
+        query = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return np.asarray(self.weights[term_ids].T @ query).ravel()
+
+    def top_n(
+        self, tokens: Iterable[str], n: int, doc_ids: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc ids, scores) of the n best documents, best first; only among `doc_ids` if given."""
+        scores = self.get_scores(tokens)
+        if doc_ids is not None:
+            scores = scores[doc_ids]
+        n = min(n, len(scores))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        # everything tied with the n-th best score is a candidate, so ties resolve exactly:
+        # later chunks first, like rank_bm25's reversed argsort
+        pos = np.flatnonzero(scores >= np.partition(scores, len(scores) - n)[len(scores) - n])
+        ids = pos if doc_ids is None else np.asarray(doc_ids, dtype=np.int64)[pos]
+        order = np.lexsort((-ids, -scores[pos]))[:n]
+        return ids[order], scores[pos[order]]
+
+    def save(self, directory: str | Path) -> None:
+        """One .npy file per array, so workers can memory-map the weights (see load)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        # tokens never contain whitespace, so the vocabulary is stored as one newline-joined utf-8 blob
+        terms = "\n".join(sorted(self.vocab, key=self.vocab.get)).encode("utf-8")
+        np.save(directory / "data.npy", self.weights.data)
+        np.save(directory / "indices.npy", self.weights.indices)
+        np.save(directory / "indptr.npy", self.weights.indptr)
+        np.save(directory / "shape.npy", np.asarray(self.weights.shape))
+        np.save(directory / "terms.npy", np.frombuffer(terms, dtype=np.uint8))
+
+    @classmethod
+    def load(cls, directory: str | Path, mmap: bool = True) -> "BM25Index":
+        """Load a saved index; with `mmap` the weight arrays stay memory-mapped read-only."""
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        weights = sparse.csr_matrix(
+            (
+                np.load(directory / "data.npy", mmap_mode=mode),
+                np.load(directory / "indices.npy", mmap_mode=mode),
+                np.load(directory / "indptr.npy", mmap_mode=mode),
+            ),
+            shape=tuple(np.load(directory / "shape.npy")),
+            copy=False,
+        )
+        terms = np.load(directory / "terms.npy").tobytes().decode("utf-8")
+        vocab = {term: i for i, term in enumerate(terms.split("\n"))} if terms else {}
+        return cls(weights, vocab)
+
+
+class SparseBM25Retriever(BaseRetriever):
+    """Drop-in replacement for langchain's BM25Retriever backed by a BM25Index."""
+
+    index: Any = None
+    docs: Any = Field(repr=False)     # list of Documents or a (memory-mapped) ChunkStore
+    k: int = 4
+    preprocess_func: Callable[[str], List[str]] = default_preprocessing_func
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: Iterable[str],
+        metadatas: Optional[Iterable[dict]] = None,
+        bm25_params: Optional[Dict[str, Any]] = None,
+        preprocess_func: Callable[[str], List[str]] = default_preprocessing_func,
+        **kwargs: Any,
+    ) -> "SparseBM25Retriever":
+        texts = list(texts)
+        metadatas = metadatas or ({} for _ in texts)
+        index = BM25Index.from_tokens([preprocess_func(t) for t in texts], **(bm25_params or {}))
+        docs = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        return cls(index=index, docs=docs, preprocess_func=preprocess_func, **kwargs)
+
+    def search(
+        self, query: str, k: Optional[int] = None, doc_ids: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(chunk ids, BM25 scores) of the top k chunks for `query`, only among `doc_ids` if given."""
+        return self.index.top_n(self.preprocess_func(query), k or self.k, doc_ids)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        ids, _ = self.search(query)
+        return [self.docs[i] for i in ids]
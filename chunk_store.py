@@ -0,0 +1,109 @@
+"""
+Read-only, memory-mapped chunk texts + metadata of a knowledge-base snapshot.
+
+Every uvicorn worker maps the same files, so the chunk texts live once in the page cache instead
+of once per worker heap (an unpickled InMemoryDocstore). Documents are rebuilt on access.
+The snapshot's store is the one copy of the chunks: FAISS (ChunkDocstore), BM25 and the
+registry / app.state.docs all reference it by chunk id. ChunkStore.from_documents packs chunks
+the same way in memory (two byte arrays instead of a Document, str and dict per chunk).
+
+Layout: chunks.bin (utf-8 texts back to back), chunk_meta.bin (one JSON object per chunk back
+to back) and chunk_offsets.npy (int64, shape (2, n + 1): text offsets, metadata offsets).
+"""
+import json
+from collections.abc import Sequence
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+TEXTS_FILE = "chunks.bin"
+META_FILE = "chunk_meta.bin"
+OFFSETS_FILE = "chunk_offsets.npy"
+
+
+def write_chunk_store(directory: str | Path, docs: List[Document]) -> None:
+    ChunkStore.from_documents(docs).save(directory)
+
+
+def _map(path: Path) -> np.ndarray:
+    # np.memmap refuses empty files
+    if path.stat().st_size == 0:
+        return np.empty(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+class ChunkStore(Sequence):
+    """Sequence of Documents backed by the memory-mapped chunk files of one snapshot."""
+
+    def __init__(self, texts: np.ndarray, metas: np.ndarray, offsets: np.ndarray):
+        self._texts = texts
+        self._metas = metas
+        self._offsets = offsets
+
+    @classmethod
+    def from_documents(cls, docs: List[Document]) -> "ChunkStore":
+        """Pack `docs` into an in-memory store."""
+        texts = [doc.page_content.encode("utf-8") for doc in docs]
+        metas = [json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8") for doc in docs]
+        offsets = np.zeros((2, len(docs) + 1), dtype=np.int64)
+        offsets[0, 1:] = np.cumsum([len(t) for t in texts])
+        offsets[1, 1:] = np.cumsum([len(m) for m in metas])
+        return cls(np.frombuffer(b"".join(texts), dtype=np.uint8),
+                   np.frombuffer(b"".join(metas), dtype=np.uint8), offsets)
+
+    def save(self, directory: str | Path) -> None:
+        directory = Path(directory)
+        self._texts.tofile(directory / TEXTS_FILE)
+        self._metas.tofile(directory / META_FILE)
+        np.save(directory / OFFSETS_FILE, self._offsets)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of text, metadata and offsets (mapped or in memory)."""
+        return int(self._texts.nbytes + self._metas.nbytes + self._offsets.nbytes)
+
+    @classmethod
+    def open(cls, directory: str | Path, mmap: bool = True) -> "ChunkStore":
+        """Map the chunk files of `directory`; with mmap=False they are read into this process instead."""
+        directory = Path(directory)
+        if mmap:
+            return cls(_map(directory / TEXTS_FILE), _map(directory / META_FILE),
+                       np.load(directory / OFFSETS_FILE, mmap_mode="r"))
+        return cls(np.fromfile(directory / TEXTS_FILE, dtype=np.uint8),
+                   np.fromfile(directory / META_FILE, dtype=np.uint8),
+                   np.load(directory / OFFSETS_FILE))
+
+    def __len__(self) -> int:
+        return self._offsets.shape[1] - 1
+
+    def text(self, i: int) -> str:
+        return self._texts[self._offsets[0, i]:self._offsets[0, i + 1]].tobytes().decode("utf-8")
+
+    def metadata(self, i: int) -> dict:
+        return json.loads(self._metas[self._offsets[1, i]:self._offsets[1, i + 1]].tobytes())
+
+    def __getitem__(self, i: Union[int, slice]):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"chunk {i} out of range")
+        return Document(page_content=self.text(i), metadata=self.metadata(i))
+
+
+class ChunkDocstore(Docstore):
+    """FAISS vector-store docstore over a ChunkStore: docstore id str(i) is chunk i."""
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+
+    def search(self, search: str) -> Union[str, Document]:
+        try:
+            return self.store[int(search)]
+        except (ValueError, IndexError):
+            return f"ID {search} not found."
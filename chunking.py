@@ -0,0 +1,153 @@
+"""
+Size-aware re-chunking of the header-split pages of one PDF.
+
+MarkdownHeaderTextSplitter cuts every page at every #/##/### header, so a knowledge base ends up
+with many tiny chunks (one menu line) and page breaks leave chunks without their headers.
+rechunk() walks the chunks of a document in order and
+- restores the header path across page breaks (a page starting mid-section belongs to it),
+- joins continuations of the same section and merges small sibling sections (same h1/h2) up to
+  `target_tokens`, each sibling keeping its ### heading in the text,
+- splits chunks over `max_tokens` with `overlap_tokens` of overlap.
+Chunks keep h1/h2/h3 (h3 only when all merged parts share it), get `header_path` and, when
+siblings were merged, `sections` (their h3 names). `source` names the page or page range.
+
+    python -m chunking          # chunk-size statistics of the knowledge base, before / after
+"""
+import re
+import statistics
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+HEADER_KEYS = ("h1", "h2", "h3")
+_SOURCE_RE = re.compile(r"^(.*) \(pages? (\d+)(?:-(\d+))?\)$")
+
+
+def header_path(metadata: dict) -> str:
+    return " > ".join(metadata[k] for k in HEADER_KEYS if metadata.get(k))
+
+
+def _pages(doc: Document):
+    """(filename, first page, last page) of a chunk's source, or None."""
+    match = _SOURCE_RE.match(str(doc.metadata.get("source", "")))
+    if not match:
+        return None
+    return match.group(1), int(match.group(2)), int(match.group(3) or match.group(2))
+
+
+def _source(parts: List[Document]) -> Optional[str]:
+    spans = [_pages(d) for d in parts]
+    if any(s is None for s in spans):
+        return parts[0].metadata.get("source")
+    first, last = min(s[1] for s in spans), max(s[2] for s in spans)
+    return f"{spans[0][0]} (page {first})" if first == last else f"{spans[0][0]} (pages {first}-{last})"
+
+
+def restore_headers(docs: List[Document]) -> List[Document]:
+    """
+    Fill in the header levels a chunk lost at a page break: a chunk without headers continues
+    the previous chunk's section, a chunk whose page starts at '###' keeps the previous h1/h2.
+    """
+    out, previous = [], {}
+    for doc in docs:
+        metadata = dict(doc.metadata)
+        levels = [k for k in HEADER_KEYS if metadata.get(k)]
+        deepest = HEADER_KEYS.index(levels[-1]) if levels else len(HEADER_KEYS)
+        for key in HEADER_KEYS[:deepest]:
+            if not metadata.get(key) and previous.get(key):
+                metadata[key] = previous[key]
+        out.append(Document(page_content=doc.page_content, metadata=metadata))
+        previous = {k: metadata.get(k) for k in HEADER_KEYS}
+    return out
+
+
+def _merge(parts: List[Document]) -> Document:
+    h3s = list(dict.fromkeys(d.metadata.get("h3") for d in parts))
+    texts = []
+    for i, doc in enumerate(parts):
+        h3 = doc.metadata.get("h3")
+        heading = len(h3s) > 1 and h3 and (i == 0 or parts[i - 1].metadata.get("h3") != h3)
+        texts.append(f"### {h3}\n{doc.page_content}" if heading else doc.page_content)
+
+    metadata = {k: v for k, v in parts[0].metadata.items() if k not in ("h3", "source")}
+    if len(h3s) == 1 and h3s[0]:
+        metadata["h3"] = h3s[0]
+    elif len(h3s) > 1:
+        metadata["sections"] = [h for h in h3s if h]
+    metadata["header_path"] = header_path(metadata)
+    source = _source(parts)
+    if source:
+        metadata["source"] = source
+    return Document(page_content="\n".join(texts), metadata=metadata)
+
+
+def rechunk(
+    docs: List[Document],
+    count_tokens: Callable[[str], int],
+    target_tokens: int = 256,
+    max_tokens: int = 320,
+    overlap_tokens: int = 48,
+) -> List[Document]:
+    """Re-chunk the header-split chunks of one document (in document order), see the module doc."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    docs = restore_headers(docs)
+    groups: List[List[Document]] = []
+    size = 0
+    for doc in docs:
+        tokens = count_tokens(doc.page_content)
+        if groups:
+            last = groups[-1][-1].metadata
+            same_section = all(last.get(k) == doc.metadata.get(k) for k in HEADER_KEYS)
+            siblings = all(last.get(k) == doc.metadata.get(k) for k in HEADER_KEYS[:2])
+            if same_section or (siblings and size + tokens <= target_tokens):
+                groups[-1].append(doc)
+                size += tokens
+                continue
+        groups.append([doc])
+        size = tokens
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=max_tokens, chunk_overlap=overlap_tokens, length_function=count_tokens
+    )
+    out = []
+    for group in groups:
+        merged = _merge(group)
+        if count_tokens(merged.page_content) <= max_tokens:
+            out.append(merged)
+        else:
+            out.extend(splitter.split_documents([merged]))
+    return out
+
+
+def chunk_stats(docs: List[Document], count_tokens: Callable[[str], int]) -> Dict[str, float]:
+    """Number of chunks and their token counts (min / p50 / p95 / max / mean / total)."""
+    sizes = sorted(count_tokens(d.page_content) for d in docs)
+    if not sizes:
+        return {"chunks": 0}
+    return {
+        "chunks": len(sizes),
+        "tokens_min": sizes[0],
+        "tokens_p50": statistics.median(sizes),
+        "tokens_p95": sizes[min(len(sizes) - 1, int(round(0.95 * (len(sizes) - 1))))],
+        "tokens_max": sizes[-1],
+        "tokens_mean": round(statistics.mean(sizes), 1),
+        "tokens_total": sum(sizes),
+    }
+
+
+if __name__ == "__main__":
+    import json
+
+    from config import KB_DIR, KB_CHUNK_TARGET_TOKENS, KB_CHUNK_MAX_TOKENS, KB_CHUNK_OVERLAP_TOKENS
+    from knowledge_base import get_chunk_token_counter, load_files
+    from pdf_ingest import pdf_files
+
+    count = get_chunk_token_counter()
+    raw = load_files(pdf_files(str(KB_DIR)), rechunk_docs=False)
+    before = [d for docs in raw.values() for d in docs]
+    after = [
+        d for docs in raw.values()
+        for d in rechunk(docs, count, KB_CHUNK_TARGET_TOKENS, KB_CHUNK_MAX_TOKENS, KB_CHUNK_OVERLAP_TOKENS)
+    ]
+    print(json.dumps({"header_split": chunk_stats(before, count), "rechunked": chunk_stats(after, count)}, indent=2))
@@ -0,0 +1,123 @@
+import os
+from pathlib import Path
+
+# Knowledge base / retrieval settings.
+# Every value can be overridden from the environment (e.g. in docker-compose.yml).
+
+KB_DIR = Path(os.getenv("KB_DIR", "knowledge_base"))
+
+EMBEDDING_MODEL_ID = "sentence-transformers/all-mpnet-base-v2"
+EMBEDDING_MODEL_DIR = Path("models/all-mpnet-base-v2")
+RERANKER_MODEL_ID = "BAAI/bge-reranker-base"
+RERANKER_MODEL_DIR = Path("models/BAAI_bge_reranker")
+
+# Built FAISS/BM25 indexes are saved here, one sub-directory per knowledge-base version
+KB_SNAPSHOT_DIR = Path(os.getenv("KB_SNAPSHOT_DIR", "index_snapshots"))
+# Memory-map snapshot vectors + chunk texts read-only, so uvicorn workers share one copy
+KB_MMAP = os.getenv("KB_MMAP", "1") == "1"
+# How many old snapshot versions to keep around (used to reuse vectors of unchanged chunks)
+KB_SNAPSHOT_KEEP = int(os.getenv("KB_SNAPSHOT_KEEP", "3"))
+
+# get_context result cache (entries are keyed by knowledge-base version + retrieval profile + normalised query)
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "512"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "3600"))  # seconds
+
+# Context passed to the LLM: near-duplicate chunks dropped, same-page chunks merged, cut at a token budget
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))  # share of shingles already seen
+CONTEXT_TOKEN_ENCODING = os.getenv("CONTEXT_TOKEN_ENCODING", "o200k_base")    # tiktoken encoding of the chat model
+
+# Semantic (embedding similarity) answer cache for information_node
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # cosine similarity
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+
+# Cross-encoder micro-batching across concurrent get_context calls
+RERANK_BATCHING = os.getenv("RERANK_BATCHING", "1") == "1"
+RERANK_MAX_BATCH_SIZE = int(os.getenv("RERANK_MAX_BATCH_SIZE", "128"))  # (query, passage) pairs
+RERANK_MAX_WAIT_MS = float(os.getenv("RERANK_MAX_WAIT_MS", "5"))
+
+# Query-embedding service: micro-batching + query -> vector LRU
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "1") == "1"
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))  # queries
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "3"))
+EMBED_QUERY_CACHE_SIZE = int(os.getenv("EMBED_QUERY_CACHE_SIZE", "1024"))
+
+# FAISS index type: "flat" (exact), "hnsw" or "ivfpq" (approximate, for larger knowledge bases)
+KB_INDEX_TYPE = os.getenv("KB_INDEX_TYPE", "flat")
+KB_HNSW_M = int(os.getenv("KB_HNSW_M", "32"))
+KB_HNSW_EF_CONSTRUCTION = int(os.getenv("KB_HNSW_EF_CONSTRUCTION", "200"))
+KB_HNSW_EF_SEARCH = int(os.getenv("KB_HNSW_EF_SEARCH", "64"))
+KB_IVF_NLIST = int(os.getenv("KB_IVF_NLIST", "256"))
+KB_IVF_NPROBE = int(os.getenv("KB_IVF_NPROBE", "16"))
+KB_PQ_M = int(os.getenv("KB_PQ_M", "48"))       # sub-quantizers, must divide the embedding size (768)
+KB_PQ_NBITS = int(os.getenv("KB_PQ_NBITS", "8"))
+
+# Watch the knowledge base directory and re-ingest changed PDFs without a restart
+KB_WATCH = os.getenv("KB_WATCH", "1") == "1"
+KB_WATCH_DEBOUNCE_S = float(os.getenv("KB_WATCH_DEBOUNCE_S", "2"))
+
+# Admin endpoints (knowledge base reload) require this token as X-Admin-Token; unset = disabled (503)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# a reload may only switch to KB_ROOT or a directory under it
+KB_ROOT = Path(os.getenv("KB_ROOT", str(KB_DIR)))
+
+# PDF ingestion: pages are parsed in a process pool once the knowledge base is large enough
+KB_PARSE_WORKERS = int(os.getenv("KB_PARSE_WORKERS", "0"))  # 0 = one per CPU core
+KB_PARSE_PAGES_PER_TASK = int(os.getenv("KB_PARSE_PAGES_PER_TASK", "4"))
+KB_PARSE_MIN_PARALLEL_PAGES = int(os.getenv("KB_PARSE_MIN_PARALLEL_PAGES", "48"))
+# chunks embedded per call when building a snapshot
+KB_EMBED_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH_SIZE", "64"))
+
+# parsed chunks of every PDF, keyed by file checksum, so unchanged PDFs are never re-parsed
+KB_PARSED_CACHE = os.getenv("KB_PARSED_CACHE", "1") == "1"
+KB_PARSED_CACHE_DIR = Path(os.getenv("KB_PARSED_CACHE_DIR", "parsed_cache"))
+
+# Chunking: merge small sibling sections up to a target size, split oversized ones with overlap.
+# Sizes are word pieces of the embedding model's tokenizer (read from EMBEDDING_MODEL_DIR)
+KB_CHUNK_MERGE = os.getenv("KB_CHUNK_MERGE", "1") == "1"
+KB_CHUNK_TARGET_TOKENS = int(os.getenv("KB_CHUNK_TARGET_TOKENS", "256"))
+KB_CHUNK_MAX_TOKENS = int(os.getenv("KB_CHUNK_MAX_TOKENS", "320"))    # all-mpnet-base-v2 truncates at 384 word pieces
+KB_CHUNK_OVERLAP_TOKENS = int(os.getenv("KB_CHUNK_OVERLAP_TOKENS", "48"))
+
+# Near-duplicate chunks (repeated footers, disclaimers, addresses) folded into one before indexing
+KB_DEDUP = os.getenv("KB_DEDUP", "1") == "1"
+KB_DEDUP_THRESHOLD = float(os.getenv("KB_DEDUP_THRESHOLD", "0.85"))  # Jaccard similarity of word 3-shingles
+KB_DEDUP_NUM_PERM = int(os.getenv("KB_DEDUP_NUM_PERM", "128"))       # MinHash permutations
+KB_DEDUP_BANDS = int(os.getenv("KB_DEDUP_BANDS", "32"))              # LSH bands, must divide KB_DEDUP_NUM_PERM
+
+# Structured menu table used by the order checker instead of full hybrid retrieval
+MENU_INDEX_ENABLED = os.getenv("MENU_INDEX_ENABLED", "1") == "1"
+MENU_MATCH_LIMIT = int(os.getenv("MENU_MATCH_LIMIT", "8"))
+MENU_FUZZY_CUTOFF = float(os.getenv("MENU_FUZZY_CUTOFF", "0.8"))
+
+# Precomputed answers to frequent questions, regenerated for every knowledge-base version
+FAQ_ENABLED = os.getenv("FAQ_ENABLED", "1") == "1"
+FAQ_QUESTIONS_FILE = os.getenv("FAQ_QUESTIONS_FILE", "faq_questions.json")
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.88"))  # cosine similarity
+
+# Hybrid first stage: BM25 and FAISS looked up concurrently, fused by chunk id in NumPy
+# (HYBRID_NATIVE_RRF=0 falls back to langchain's EnsembleRetriever)
+HYBRID_NATIVE_RRF = os.getenv("HYBRID_NATIVE_RRF", "1") == "1"
+HYBRID_VECTOR_K = int(os.getenv("HYBRID_VECTOR_K", "4"))           # FAISS candidates per query
+HYBRID_SEARCH_THREADS = int(os.getenv("HYBRID_SEARCH_THREADS", "8"))
+
+# Retrieval profiles (retrieval_profiles.py): the order checker only searches these h2 sections (regex)
+RETRIEVAL_ORDER_SECTIONS = os.getenv("RETRIEVAL_ORDER_SECTIONS", r"menu|item descriptions")
+
+# Adaptive reranking: skip or shrink the cross-encoder when BM25 and FAISS already agree
+RERANK_ADAPTIVE = os.getenv("RERANK_ADAPTIVE", "1") == "1"
+RERANK_AGREEMENT_K = int(os.getenv("RERANK_AGREEMENT_K", "3"))
+RERANK_SKIP_OVERLAP = float(os.getenv("RERANK_SKIP_OVERLAP", "0.67"))
+RERANK_SKIP_MARGIN = float(os.getenv("RERANK_SKIP_MARGIN", "0.25"))  # #1-#2 lead / score spread, per first stage
+RERANK_SHRINK_OVERLAP = float(os.getenv("RERANK_SHRINK_OVERLAP", "0.34"))
+RERANK_SHRINK_TOP = int(os.getenv("RERANK_SHRINK_TOP", "6"))
+
+# Inference backend of the embedder / reranker: torch, onnx or onnx-int8 (dynamically quantised).
+# ONNX exports are made once under <model dir>/onnx_export; if that fails the model runs on torch.
+# The ONNX backends need the extra dependencies of requirements-onnx.txt.
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", MODEL_BACKEND)
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", MODEL_BACKEND)
+# int8 kernels to quantise for: arm64, avx2, avx512 or avx512_vnni
+MODEL_ONNX_QUANT_CONFIG = os.getenv("MODEL_ONNX_QUANT_CONFIG", "avx2")
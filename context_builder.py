@@ -0,0 +1,86 @@
+"""
+Prompt context from reranked chunks: near-duplicates dropped, chunks of the same source page
+merged into one block, blocks in relevance order, cut at a token budget.
+"""
+import functools
+import re
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@functools.lru_cache(maxsize=4)
+def get_token_counter(encoding: str = "o200k_base") -> Callable[[str], int]:
+    """
+    Token count of a text with the chat model's tiktoken encoding. tiktoken fetches encodings on
+    first use; when it is missing or offline the count is estimated as ~4 characters per token.
+    """
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding(encoding)
+        return lambda text: len(enc.encode_ordinary(text))
+    except Exception as e:
+        print(f"[!] tiktoken encoding {encoding} unavailable, estimating tokens from length: {e}")
+        return lambda text: (len(text) + 3) // 4
+
+
+def shingles(text: str, size: int = 3) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def truncate_to_budget(text: str, budget: int, count_tokens: Callable[[str], int]) -> str:
+    """Longest prefix of whole lines (or words, for a single long line) that fits in `budget` tokens."""
+    for sep in ("\n", " "):
+        parts = text.split(sep)
+        kept: List[str] = []
+        for part in parts:
+            if count_tokens(sep.join(kept + [part])) > budget:
+                break
+            kept.append(part)
+        if kept:
+            return sep.join(kept)
+    return ""
+
+
+def build_context(
+    docs: List[Document],
+    token_budget: int = 1500,
+    dedup_threshold: float = 0.8,
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> str:
+    """
+    Join `docs` (best first) into one context string.
+
+    - a chunk whose word 3-shingles are covered by already kept chunks for at least
+      `dedup_threshold` is dropped (repeated header fragments, the same text on two pages)
+    - chunks with the same `source` are merged into the block of the first one
+    - blocks keep the rank of their best chunk; chunks are added until `token_budget` is reached,
+      the very first chunk is truncated rather than dropped
+    """
+    count_tokens = count_tokens or get_token_counter()
+    blocks: Dict[object, List[str]] = {}
+    seen: set = set()
+    used = 0
+
+    for doc in docs:
+        text = doc.page_content.strip()
+        grams = shingles(text)
+        if not grams or len(grams & seen) / len(grams) >= dedup_threshold:
+            continue
+        source = doc.metadata.get("source") or id(doc)
+        cost = count_tokens(text) + 1   # + separator
+        if used + cost > token_budget:
+            if blocks:
+                break
+            text = truncate_to_budget(text, token_budget, count_tokens)
+            cost = count_tokens(text)
+        blocks.setdefault(source, []).append(text)
+        seen |= grams
+        used += cost
+
+    return "\n\n".join("\n".join(parts) for parts in blocks.values())
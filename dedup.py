@@ -0,0 +1,143 @@
+"""
+Near-duplicate chunk elimination before indexing.
+
+PDFs repeat boilerplate (footers, allergen disclaimers, branch addresses) on every page; each
+copy would be embedded, indexed and retrieved on its own and push useful chunks out of the top-k.
+Chunks are compared by the Jaccard similarity of their word 3-shingles, estimated with MinHash
+signatures and LSH banding (so only candidate pairs are compared exactly). Every near-duplicate
+is folded into the first chunk of its cluster: the longest text of the cluster is kept, the
+`source` of all copies is merged and the copies are listed in `duplicates`.
+
+    python -m dedup             # duplicate clusters of the knowledge base and how much they shrink it
+"""
+import zlib
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from context_builder import shingles
+
+_PRIME = np.uint64((1 << 61) - 1)
+SOURCE_SEP = "; "
+
+
+def _shingle_hashes(shingle_set: set) -> np.ndarray:
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+
+
+def minhash_signatures(shingle_sets: List[set], num_perm: int = 128, seed: int = 1) -> np.ndarray:
+    """(n, num_perm) MinHash signatures of the shingle sets, deterministic across processes."""
+    rng = np.random.default_rng(seed)
+    # a, b < 2^31 and crc32 < 2^32 keep a * x + b below 2^64
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    signatures = np.full((len(shingle_sets), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, shingle_set in enumerate(shingle_sets):
+        if shingle_set:
+            hashes = _shingle_hashes(shingle_set)[:, None]
+            signatures[i] = ((hashes * a + b) % _PRIME).min(axis=0)
+    return signatures
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _merged_source(docs: List[Document]) -> Optional[str]:
+    sources = []
+    for doc in docs:
+        for source in str(doc.metadata.get("source") or "").split(SOURCE_SEP):
+            if source and source not in sources:
+                sources.append(source)
+    return SOURCE_SEP.join(sources) or None
+
+
+def _fold(cluster: List[Document]) -> Document:
+    keep = max(cluster, key=lambda d: len(d.page_content))   # first of the longest
+    metadata = dict(keep.metadata)
+    source = _merged_source(cluster)
+    if source:
+        metadata["source"] = source
+    metadata["duplicates"] = len(cluster) - 1
+    return Document(page_content=keep.page_content, metadata=metadata)
+
+
+def dedup_documents(
+    docs: List[Document],
+    threshold: float = 0.85,
+    num_perm: int = 128,
+    bands: int = 32,
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> Tuple[List[Document], Dict]:
+    """
+    Collapse chunks whose 3-shingle Jaccard similarity with an earlier kept chunk is at least
+    `threshold`. Returns (chunks in their original order, report).
+
+    `bands` * rows = `num_perm`; pairs above ~(1 / bands) ** (1 / rows) become candidates and
+    are then compared exactly, so the LSH only decides which pairs are looked at.
+    """
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    count_tokens = count_tokens or (lambda text: (len(text) + 3) // 4)
+    shingle_sets = [shingles(d.page_content) for d in docs]
+    signatures = minhash_signatures(shingle_sets, num_perm)
+    rows = num_perm // bands
+
+    buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+    clusters: Dict[int, List[int]] = {}   # representative -> members, in document order
+    for i, signature in enumerate(signatures):
+        keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(bands)]
+        candidates = dict.fromkeys(rep for key in keys for rep in buckets.get(key, ()))
+        rep = next((c for c in candidates if jaccard(shingle_sets[i], shingle_sets[c]) >= threshold), None)
+        if rep is not None:
+            clusters[rep].append(i)
+            continue
+        clusters[i] = [i]
+        for key in keys:
+            buckets[key].append(i)
+
+    out = [
+        _fold([docs[m] for m in members]) if len(members) > 1 else docs[rep]
+        for rep, members in clusters.items()
+    ]
+    tokens_before = sum(count_tokens(d.page_content) for d in docs)
+    tokens_after = sum(count_tokens(d.page_content) for d in out)
+    duplicate_clusters = sorted((m for m in clusters.values() if len(m) > 1), key=len, reverse=True)
+    report = {
+        "chunks_before": len(docs),
+        "chunks_after": len(out),
+        "chunks_removed": len(docs) - len(out),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_removed_pct": round(100 * (1 - tokens_after / tokens_before), 1) if tokens_before else 0.0,
+        "clusters": [
+            {"copies": len(m), "sources": _merged_source([docs[i] for i in m]),
+             "text": docs[m[0]].page_content[:80]}
+            for m in duplicate_clusters
+        ],
+    }
+    return out, report
+
+
+def format_report(report: Dict) -> str:
+    return (
+        f"[i] Dedup: {report['chunks_before']} -> {report['chunks_after']} chunks "
+        f"({report['chunks_removed']} near-duplicates in {len(report['clusters'])} clusters), "
+        f"{report['tokens_removed_pct']}% fewer tokens to embed and index"
+    )
+
+
+if __name__ == "__main__":
+    import json
+
+    from config import KB_DIR, KB_DEDUP_THRESHOLD, KB_DEDUP_NUM_PERM, KB_DEDUP_BANDS
+    from knowledge_base import get_chunk_token_counter, load_documents
+
+    _, report = dedup_documents(
+        load_documents(str(KB_DIR), dedup=False), KB_DEDUP_THRESHOLD, KB_DEDUP_NUM_PERM, KB_DEDUP_BANDS,
+        get_chunk_token_counter(),
+    )
+    print(format_report(report))
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,78 @@
+import dataclasses
+import gzip
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import List, Optional
+
+import pypdf
+from langchain_core.documents import Document
+
+from config import KB_PARSED_CACHE_DIR
+from pdf_ingest import HEADERS_TO_SPLIT_ON
+
+# Anything that changes what parsing produces (chunks or menu_index.parse_menu) must change this key
+PARSE_FORMAT = hashlib.sha1(
+    json.dumps({"format": 2, "pypdf": pypdf.__version__, "headers": HEADERS_TO_SPLIT_ON}).encode("utf-8")
+).hexdigest()[:8]
+
+_SOURCE_RE = re.compile(r"\(page (\d+)\)$")
+
+
+def _cache_path(checksum: str, kind: str = "") -> Path:
+    return Path(KB_PARSED_CACHE_DIR) / f"{checksum}-{PARSE_FORMAT}{kind}.json.gz"
+
+
+def _write(path: Path, rows: list) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+        json.dump(rows, fh, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_parsed(checksum: str, filename: str) -> Optional[List[Document]]:
+    """
+    Chunks previously parsed from a PDF with this checksum, or None.
+    The cache is keyed by content only, so `source` is rebuilt with the current filename.
+    """
+    try:
+        with gzip.open(_cache_path(checksum), "rt", encoding="utf-8") as fh:
+            rows = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    docs = []
+    for row in rows:
+        metadata = dict(row["m"])
+        metadata["source"] = f"{filename} (page {row['p']})"
+        docs.append(Document(page_content=row["t"], metadata=metadata))
+    return docs
+
+
+def save_parsed(checksum: str, docs: List[Document]) -> None:
+    """Store chunk text + header metadata (gzip'd JSON), written atomically."""
+    rows = []
+    for doc in docs:
+        metadata = {k: v for k, v in doc.metadata.items() if k != "source"}
+        match = _SOURCE_RE.search(str(doc.metadata.get("source", "")))
+        rows.append({"t": doc.page_content, "m": metadata, "p": match.group(1) if match else "unknown"})
+    _write(_cache_path(checksum), rows)
+
+
+def load_menu(checksum: str, filename: str) -> Optional[list]:
+    """MenuItems previously extracted from a PDF with this checksum, or None."""
+    from menu_index import MenuItem
+
+    try:
+        with gzip.open(_cache_path(checksum, ".menu"), "rt", encoding="utf-8") as fh:
+            rows = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return [MenuItem(**{**row, "source": filename}) for row in rows]
+
+
+def save_menu(checksum: str, items: list) -> None:
+    """Store the MenuItems of a PDF next to its chunks, under the same checksum key."""
+    _write(_cache_path(checksum, ".menu"), [dataclasses.asdict(item) for item in items])
@@ -0,0 +1,237 @@
+"""
+Precomputed answers to the most frequent information questions (hours, address, delivery area...).
+
+Every question of the FAQ list (FAQ_QUESTIONS_FILE) is answered once per knowledge-base version
+through the normal retrieval + Information_Retrieval prompt. An answer is only served if it
+passes vetting: an entry's own `answer` in the FAQ list is taken as vetted, a generated one must
+not be a refusal and every number in it (prices, times, phone numbers) must appear in the
+retrieved context. The table is saved next to the snapshot (<snapshot>/faq_answers.json) and
+matched by embedding similarity against the questions and their paraphrases. Answers whose
+generation failed (LLM outage) are not saved, so the next refresh retries them.
+
+    python -m faq_table         # generate the table of the current knowledge base ahead of time
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import FAQ_QUESTIONS_FILE, FAQ_MATCH_THRESHOLD, KB_SNAPSHOT_DIR
+
+FAQ_FILE = "faq_answers.json"
+REFUSAL_RE = re.compile(
+    r"\b(not available|not mentioned|not provided|no information|not specified|don't have|do not have|"
+    r"unable to|cannot|can't|sorry)\b",
+    re.IGNORECASE,
+)
+# prices, times, phone numbers, percentages: anything with a digit
+FACT_RE = re.compile(r"\d[\d,:.\-]*\d|\d")
+GENERATION_FAILED = "generation failed"
+
+
+def load_faq_list(path: str = FAQ_QUESTIONS_FILE) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def faq_list_digest(faqs: List[dict]) -> str:
+    return hashlib.sha1(json.dumps(faqs, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def vet_answer(answer: str, context: str) -> Optional[str]:
+    """Why `answer` must not be served without the LLM, or None if it is fit to serve."""
+    if not answer.strip():
+        return "empty answer"
+    if REFUSAL_RE.search(answer):
+        return "the knowledge base does not answer it"
+    context = context.replace(",", "")
+    missing = [fact for fact in FACT_RE.findall(answer) if fact.replace(",", "") not in context]
+    if missing:
+        return f"not found in the context: {', '.join(missing)}"
+    return None
+
+
+def generate_answer(question: str) -> Tuple[str, str]:
+    """(answer, context) for one question, exactly as information_node would answer it."""
+    from nodes.general_nodes import get_context, information_processor
+
+    context = get_context(question, profile="information")
+    response = information_processor.execute_query(query=question, conversation_history="", context=context)
+    return str(response.content).strip(), context
+
+
+def generate_table(faqs: List[dict], answer_fn: Callable[[str], Tuple[str, str]] = generate_answer) -> List[dict]:
+    entries = []
+    for faq in faqs:
+        if faq.get("answer"):
+            answer, reason = faq["answer"], None
+        else:
+            try:
+                answer, context = answer_fn(faq["question"])
+                reason = vet_answer(answer, context)
+            except Exception as e:
+                answer, reason = "", f"{GENERATION_FAILED}: {e}"
+        if reason:
+            print(f"[!] FAQ '{faq['id']}' not served from the table: {reason}")
+        entries.append({"id": faq["id"], "question": faq["question"], "answer": answer, "vetted": reason is None,
+                        "reason": reason})
+    return entries
+
+
+def generation_failed(entry: dict) -> bool:
+    """True for an entry whose answer could not be generated (LLM error), as opposed to one that failed vetting."""
+    return str(entry.get("reason") or "").startswith(GENERATION_FAILED)
+
+
+class FAQTable:
+    """
+    Vetted FAQ answers of the live knowledge base, matched by cosine similarity of the query
+    against every FAQ question and paraphrase.
+    """
+
+    def __init__(self, threshold: float = FAQ_MATCH_THRESHOLD, questions_file: str = FAQ_QUESTIONS_FILE):
+        self.threshold = threshold
+        self.questions_file = questions_file
+        self._lock = threading.Lock()
+        self.version: Optional[str] = None
+        self._entries: List[dict] = []
+        self._vectors: Optional[np.ndarray] = None  # (n, dim), L2-normalised rows
+        self._answers: List[str] = []               # answer of every row
+        self._phrases: List[str] = []
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalised(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+    def lookup(self, query: str) -> Optional[str]:
+        """Precomputed answer of the FAQ `query` matches, else None (nothing is embedded while empty)."""
+        with self._lock:
+            vectors, answers, phrases = self._vectors, self._answers, self._phrases
+        if vectors is None:
+            return None
+        from kb_registry import registry
+
+        sims = vectors @ self._normalised(registry.get_embeddings().embed_query(query))
+        best = int(np.argmax(sims))
+        with self._lock:
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+        print(f"[i] FAQ hit ({sims[best]:.3f}): '{query}' ~ '{phrases[best]}'")
+        return answers[best]
+
+    def load(self, version: str, entries: List[dict], faqs: List[dict]) -> None:
+        """Make the vetted `entries` of knowledge base `version` live."""
+        from kb_registry import registry
+
+        by_id = {faq["id"]: faq for faq in faqs}
+        phrases, answers = [], []
+        for entry in entries:
+            if entry["vetted"]:
+                for phrase in [entry["question"]] + by_id.get(entry["id"], {}).get("paraphrases", []):
+                    phrases.append(phrase)
+                    answers.append(entry["answer"])
+        vectors = self._normalised(registry.get_embeddings().embed_documents(phrases)) if phrases else None
+        with self._lock:
+            self.version = version
+            self._entries = entries
+            self._vectors, self._answers, self._phrases = vectors, answers, phrases
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version = None
+            self._entries = []
+            self._vectors, self._answers, self._phrases = None, [], []
+
+    def refresh(self, version: str, force: bool = False) -> List[dict]:
+        """
+        Load the table saved for knowledge base `version`, generating the answers it lacks first:
+        all of them when it is missing, stale (FAQ list changed) or `force`d, otherwise those
+        whose generation failed last time (they are never saved). Returns its entries.
+        """
+        from kb_registry import registry
+        from kb_snapshot import snapshot_lock
+
+        faqs = load_faq_list(self.questions_file)
+        digest = faq_list_digest(faqs)
+        path = KB_SNAPSHOT_DIR / version / FAQ_FILE
+
+        def read_saved() -> Dict[str, dict]:
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    saved = json.load(fh)
+            except (OSError, ValueError):
+                return {}
+            if saved.get("faq_digest") != digest:
+                return {}
+            return {e["id"]: e for e in saved["entries"] if not generation_failed(e)}
+
+        by_id = {} if force else read_saved()
+        missing = [faq for faq in faqs if faq["id"] not in by_id]
+        if missing:
+            # the LLM calls run without the snapshot lock, which only guards the write
+            print(f"[i] Generating FAQ answers for knowledge base {version} ({len(missing)}/{len(faqs)} questions)")
+            generated = {e["id"]: e for e in generate_table(missing)}
+            with snapshot_lock():
+                # answers another worker saved meanwhile are kept
+                saved = {**({} if force else read_saved()),
+                         **{i: e for i, e in generated.items() if not generation_failed(e)}}
+                tmp = path.with_name(f".{FAQ_FILE}.tmp-{os.getpid()}")
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    json.dump({"kb_version": version, "faq_digest": digest,
+                               "entries": [saved[f["id"]] for f in faqs if f["id"] in saved]}, fh, indent=2)
+                os.replace(tmp, path)
+            by_id = {**saved, **{i: e for i, e in generated.items() if i not in saved}}
+        entries = [by_id[faq["id"]] for faq in faqs]
+
+        if registry.version != version:
+            return entries  # a newer knowledge base went live meanwhile, its own refresh loads the table
+        self.load(version, entries, faqs)
+        print(f"[i] FAQ table of {version} live: {sum(e['vetted'] for e in entries)}/{len(entries)} answers vetted")
+        return entries
+
+    def on_kb_swap(self, version: str) -> None:
+        """Registry listener: answers of the old knowledge base go at once, the new table loads in the background."""
+        self.clear()
+
+        def run():
+            try:
+                self.refresh(version)
+            except Exception as e:
+                print(f"[!] FAQ table of {version} could not be built: {e}")
+
+        threading.Thread(target=run, name="faq-table", daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "vetted": sum(e["vetted"] for e in self._entries),
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# process-wide table, kept in line with the registry by nodes.general_nodes
+faq_table = FAQTable()
+
+
+if __name__ == "__main__":
+    from kb_registry import registry
+
+    registry.get_retriever()
+    for entry in faq_table.refresh(registry.version, force=True):
+        status = "ok" if entry["vetted"] else f"skipped ({entry['reason']})"
+        print(f"- {entry['id']}: {status}\n  {entry['answer']}")
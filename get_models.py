@@ -16,6 +16,52 @@ MODEL_MARKERS = [
     "tokenizer_config.json",
 ]
 
+# torch = the PyTorch weights; onnx / onnx-int8 = an exported (and dynamically quantised) ONNX copy
+ONNX_BACKENDS = ("onnx", "onnx-int8")
+
+
+def ensure_onnx_model(
+    model_dir: Path,
+    export_dir: Path,
+    backend: str,
+    kind: str = "embedding",
+    quant_config: str = "avx2",
+) -> Optional[Tuple[Path, str]]:
+    """
+    Export the sentence-transformers model in `model_dir` to ONNX under `export_dir` once
+    (plus a dynamically quantised int8 copy for backend="onnx-int8").
+
+    kind is "embedding" (SentenceTransformer) or "cross-encoder" (CrossEncoder).
+    Returns (export_dir, onnx file name relative to it), or None when ONNX is not available
+    (sentence-transformers[onnx] missing, export failed): the caller then uses torch.
+    """
+    export_dir = Path(export_dir)
+    wanted = "model.onnx" if backend == "onnx" else f"model_qint8_{quant_config}.onnx"
+    found = sorted(export_dir.rglob(wanted)) if export_dir.is_dir() else []
+    if found:
+        return export_dir, str(found[0].relative_to(export_dir))
+
+    try:
+        from sentence_transformers import CrossEncoder, SentenceTransformer, export_dynamic_quantized_onnx_model
+        model_cls = CrossEncoder if kind == "cross-encoder" else SentenceTransformer
+        if not (export_dir.is_dir() and any(export_dir.rglob("model.onnx"))):
+            print(f"[i] Exporting {model_dir} to ONNX in {export_dir} ...")
+            # no ONNX file in model_dir: sentence-transformers exports one on load
+            model_cls(str(model_dir), backend="onnx").save_pretrained(str(export_dir))
+        if backend == "onnx-int8":
+            print(f"[i] Quantising {export_dir} to int8 ({quant_config}) ...")
+            model = model_cls(str(export_dir), backend="onnx")
+            export_dynamic_quantized_onnx_model(model, quant_config, str(export_dir))
+    except Exception as e:
+        print(f"[!] ONNX export of {model_dir} failed, falling back to torch: {e}", file=sys.stderr)
+        return None
+
+    found = sorted(export_dir.rglob(wanted))
+    if not found:
+        print(f"[!] ONNX export did not produce {wanted} in {export_dir}, falling back to torch", file=sys.stderr)
+        return None
+    return export_dir, str(found[0].relative_to(export_dir))
+
 
 def ensure_model_dir(
     repo_id: str,
@@ -24,6 +70,9 @@ def ensure_model_dir(
     *,
     whisper_name: Optional[str] = None,
     is_gtts: bool = False,
+    backend: str = "torch",
+    onnx_kind: str = "embedding",
+    quant_config: str = "avx2",
 ) -> Tuple[Path, Optional[Any]]:
     """
     Ensure an artifact is available under `target_dir`.
@@ -37,9 +86,14 @@ def ensure_model_dir(
 
     - For gTTS: set is_gtts=True (or use repo_id == "gtts"). This just ensures a cache dir and returns (target_dir, None).
 
+    - backend="onnx" / "onnx-int8" (HF sentence-transformers models): the model is also exported
+      to ONNX under target_dir/onnx_export and (export_dir, onnx_file_name) is returned.
+      If the export is not possible the torch model dir is returned with extra None.
+
     Returns:
       (Path_to_model_dir_or_cache, extra)
-      where extra is None for HF/gTTS, or the loaded Whisper model for whisper_name case.
+      where extra is None for HF/gTTS, the ONNX file name for ONNX backends, or the loaded
+      Whisper model for whisper_name case.
     """
     target_dir = Path(target_dir)
     target_dir.mkdir(parents=True, exist_ok=True)
@@ -97,27 +151,35 @@ def ensure_model_dir(
                         return True
         return False
 
-    # direct hit
-    if has_marker(snapshot_path):
-        return snapshot_path, None
-
-    # children
-    for child in snapshot_path.iterdir():
-        if has_marker(child):
-            return child, None
-
-    # deeper search (rglob)
-    for p in snapshot_path.rglob("*"):
-        if p.is_dir():
-            for m in MODEL_MARKERS:
-                if (p / m).exists():
-                    return p, None
-
-    # nothing found
-    raise OSError(
-        f"No model files found under snapshot path {snapshot_path}. "
-        f"Expected one of: {MODEL_MARKERS}. Inspect the folder to see where the model files live."
-    )
+    def find_model_dir() -> Path:
+        # direct hit
+        if has_marker(snapshot_path):
+            return snapshot_path
+
+        # children
+        for child in snapshot_path.iterdir():
+            if has_marker(child):
+                return child
+
+        # deeper search (rglob)
+        for p in snapshot_path.rglob("*"):
+            if p.is_dir():
+                for m in MODEL_MARKERS:
+                    if (p / m).exists():
+                        return p
+
+        # nothing found
+        raise OSError(
+            f"No model files found under snapshot path {snapshot_path}. "
+            f"Expected one of: {MODEL_MARKERS}. Inspect the folder to see where the model files live."
+        )
+
+    model_dir = find_model_dir()
+    if backend in ONNX_BACKENDS:
+        exported = ensure_onnx_model(model_dir, target_dir / "onnx_export", backend, onnx_kind, quant_config)
+        if exported is not None:
+            return exported
+    return model_dir, None
 
 # assumes ensure_model_dir is available in the same module or imported
 # ensure_model_dir(repo_id: str, target_dir: Path, force: bool=False, *, whisper_name: Optional[str]=None, is_gtts: bool=False)
@@ -0,0 +1,150 @@
+"""
+BM25 + FAISS hybrid retrieval fused with reciprocal rank fusion over integer chunk ids.
+
+Replaces EnsembleRetriever(weights, c): the FAISS lookup (query embedding + index search) runs
+on a worker thread while BM25 scores on the calling one, and the two ranked id lists are fused
+in NumPy. FAISS row i, BM25 document i and chunk i of the snapshot's chunk store are the same
+chunk, so no Documents are built or compared before fusion. Every returned Document carries
+its scores in the metadata: `chunk_id`, `rrf_score`, and `bm25_score` / `vector_score` for the
+stages that found it.
+
+with_profile() gives a copy restricted to the chunks of a retrieval profile (see
+retrieval_profiles): BM25 only scores them and FAISS only searches them.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, Field, PrivateAttr
+
+from config import HYBRID_SEARCH_THREADS
+
+STAGES = ("bm25", "vector")
+
+# FAISS lookups of concurrent queries (FAISS and the embedder release the GIL)
+_search_pool = ThreadPoolExecutor(max_workers=HYBRID_SEARCH_THREADS, thread_name_prefix="hybrid-search")
+
+
+def rrf_fuse(
+    id_lists: Sequence[np.ndarray], weights: Sequence[float], c: int = 60
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted reciprocal rank fusion: score(d) = sum of weight / (rank + c) over the lists that
+    rank d (rank from 1). Returns (ids, scores), best first; ties keep first-seen order, as in
+    EnsembleRetriever.weighted_reciprocal_rank.
+    """
+    ids = np.concatenate([np.asarray(lst, dtype=np.int64) for lst in id_lists]) if id_lists else np.empty(0)
+    if not len(ids):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    contributions = np.concatenate([
+        weight / (np.arange(1, len(lst) + 1, dtype=np.float64) + c) for lst, weight in zip(id_lists, weights)
+    ])
+    unique, first_seen, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    scores = np.bincount(inverse.ravel(), weights=contributions, minlength=len(unique))
+    order = np.lexsort((first_seen, -scores))
+    return unique[order], scores[order]
+
+
+class HybridRRFRetriever(BaseRetriever):
+    """Concurrent BM25 + FAISS lookups, vectorised RRF over chunk ids, scored Documents."""
+
+    bm25: Any                      # SparseBM25Retriever over the chunk store; its `k` is the BM25 depth
+    vector_store: Any              # langchain FAISS, row i = chunk i
+    vector_k: int = 4
+    weights: List[float] = Field(default_factory=lambda: [0.5, 0.5])   # bm25, vector
+    c: int = 60
+    id_key: str = "chunk_id"       # AdaptiveRerankRetriever compares candidates by this metadata key
+    bm25_k: Optional[int] = None   # None: the BM25 retriever's own k
+    chunk_ids: Optional[np.ndarray] = Field(default=None, repr=False)   # searched chunks, None = all
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    _search_params: Any = PrivateAttr(default=None)   # faiss id selector of `chunk_ids`
+
+    @property
+    def docs(self):
+        return self.bm25.docs
+
+    def _metadata(self, chunk_id: int) -> dict:
+        docs = self.docs
+        return docs.metadata(chunk_id) if hasattr(docs, "metadata") else docs[chunk_id].metadata
+
+    def with_profile(self, profile) -> "HybridRRFRetriever":
+        """Copy using a RetrievalProfile's candidate counts and section filter (same indexes)."""
+        from ann_index import filtered_search_params
+
+        chunk_ids = None
+        if profile.sections:
+            chunk_ids = np.fromiter(
+                (i for i in range(len(self.docs)) if profile.matches(self._metadata(i))), dtype=np.int64
+            )
+            print(f"[i] Retrieval profile '{profile.name}' searches {len(chunk_ids)}/{len(self.docs)} chunks")
+        copy = self.model_copy(update={"bm25_k": profile.bm25_k, "vector_k": profile.vector_k, "chunk_ids": chunk_ids})
+        copy._search_params = None if chunk_ids is None else filtered_search_params(self.vector_store.index, chunk_ids)
+        return copy
+
+    def bm25_search(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        return self.bm25.search(query, self.bm25_k, self.chunk_ids)
+
+    def vector_search(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(chunk ids, relevance scores in [0, 1]-ish, higher is better) of the `vector_k` nearest chunks."""
+        import faiss
+
+        store = self.vector_store
+        vector = np.asarray([store._embed_query(query)], dtype=np.float32)
+        if store._normalize_L2:
+            faiss.normalize_L2(vector)
+        if self._search_params is None:
+            distances, labels = store.index.search(vector, self.vector_k)
+        else:
+            distances, labels = store.index.search(vector, self.vector_k, params=self._search_params)
+        found = labels[0] >= 0
+        relevance = store._select_relevance_score_fn()
+        scores = np.fromiter((relevance(float(d)) for d in distances[0][found]), dtype=np.float64)
+        return labels[0][found].astype(np.int64), scores
+
+    def search(self, query: str) -> Tuple[Dict[str, Tuple[np.ndarray, np.ndarray]], np.ndarray, np.ndarray]:
+        """({stage: (ids, scores)}, fused ids, fused RRF scores), both stages looked up at once."""
+        vector = _search_pool.submit(self.vector_search, query)
+        stages = {"bm25": self.bm25_search(query), "vector": vector.result()}
+        ids, scores = rrf_fuse([stages[s][0] for s in STAGES], self.weights, self.c)
+        return stages, ids, scores
+
+    def to_documents(
+        self,
+        ids: np.ndarray,
+        stages: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None,
+        rrf_scores: Optional[np.ndarray] = None,
+    ) -> List[Document]:
+        """Documents of chunk `ids` (fresh metadata dicts) with the scores known for them."""
+        stage_scores = {
+            stage: dict(zip(stage_ids.tolist(), stage_values.tolist()))
+            for stage, (stage_ids, stage_values) in (stages or {}).items()
+        }
+        out = []
+        for n, chunk_id in enumerate(ids.tolist()):
+            doc = self.docs[chunk_id]
+            metadata = {**doc.metadata, self.id_key: chunk_id}
+            if rrf_scores is not None:
+                metadata["rrf_score"] = float(rrf_scores[n])
+            for stage, scores in stage_scores.items():
+                if chunk_id in scores:
+                    metadata[f"{stage}_score"] = float(scores[chunk_id])
+            out.append(Document(page_content=doc.page_content, metadata=metadata))
+        return out
+
+    def rank_lists(self, query: str) -> Tuple[List[List[Document]], List[Document]]:
+        """([BM25 documents, FAISS documents], fused documents), for rerankers that look at both stages."""
+        stages, ids, scores = self.search(query)
+        fused = self.to_documents(ids, stages, scores)
+        by_id = {doc.metadata[self.id_key]: doc for doc in fused}
+        return [[by_id[i] for i in stages[s][0].tolist()] for s in STAGES], fused
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        stages, ids, scores = self.search(query)
+        return self.to_documents(ids, stages, scores)
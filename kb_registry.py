@@ -0,0 +1,229 @@
+import gc
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import KB_DIR, KB_DEDUP, MENU_FUZZY_CUTOFF
+
+
+def rss_mb() -> float:
+    """Resident memory of this process (Linux /proc; elsewhere the peak so far from getrusage)."""
+    try:
+        with open("/proc/self/statm", "r") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PeakMemory:
+    """Samples rss_mb() on a background thread while the block runs; `peak_mb` is the highest seen."""
+
+    def __init__(self, interval_s: float = 0.05):
+        self.interval_s = interval_s
+        self.start_mb = self.peak_mb = self.end_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.peak_mb = max(self.peak_mb, rss_mb())
+
+    def __enter__(self) -> "PeakMemory":
+        self.start_mb = self.peak_mb = rss_mb()
+        self._thread = threading.Thread(target=self._sample, name="peak-memory", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.end_mb = rss_mb()
+        self.peak_mb = max(self.peak_mb, self.end_mb)
+
+
+class KnowledgeBaseRegistry:
+    """
+    Single owner of the heavy retrieval resources: documents, embedder, cross-encoder and retriever.
+
+    Nothing is loaded at import time. Each resource is built on first use (thread-safe) and the
+    same instance is handed to get_context, the graph nodes and app.state.
+    refresh() re-ingests only changed PDFs and swaps the new retriever in atomically; callers
+    that already hold the old retriever finish their query on it, and it is freed after them.
+    """
+
+    def __init__(self, directory_path: str | Path = KB_DIR):
+        self.directory_path = str(directory_path)
+        self._lock = threading.RLock()
+        self._swap_lock = threading.Lock()           # held only while the live version/retriever pair is read or swapped
+        self._models: Optional[Tuple[Any, Any]] = None
+        self._docs: Optional[Sequence] = None        # the live snapshot's ChunkStore
+        self._retriever = None
+        self.version: Optional[str] = None
+        self._files: Dict[str, str] = {}            # filename -> checksum of the live build
+        self._docs_by_file: Dict[str, Any] = {}     # filename -> its chunks of the live build, packed (ChunkStore)
+        self._menu_by_file: Dict[str, List] = {}    # filename -> MenuItems of the live build
+        self._menu = None
+        self._listeners: List[Callable[[str], None]] = []
+        self.last_build: Optional[Dict[str, Any]] = None   # timings and memory of the last refresh()
+        self._profiled: Dict[str, Tuple[Any, Any]] = {}     # profile -> (base retriever, its profile copy)
+
+    def add_listener(self, callback: Callable[[str], None]) -> None:
+        """Register `callback(version)`, called every time a (re)built knowledge base goes live."""
+        self._listeners.append(callback)
+
+    def get_models(self) -> Tuple[Any, Any]:
+        """Return (embeddings, cross_encoder), loading them once."""
+        if self._models is None:
+            with self._lock:
+                if self._models is None:
+                    from knowledge_base import load_models
+                    self._models = load_models()
+        return self._models
+
+    def get_embeddings(self):
+        """The shared query/document embedder (batched + cached query embeddings when enabled)."""
+        return self.get_models()[0]
+
+    def get_docs(self) -> Sequence:
+        """Chunks of the live knowledge base: the snapshot's chunk store, shared with FAISS and BM25."""
+        if self._docs is None:
+            self._build()
+        return self._docs
+
+    def get_menu_index(self):
+        """Structured menu table (items, categories, prices) of the live knowledge base."""
+        if self._menu is None:
+            self._build()
+        return self._menu
+
+    def get_retriever(self, profile: Optional[str] = None):
+        """The live retriever, or its copy for a named retrieval profile (see retrieval_profiles)."""
+        return self.get_live(profile)[1]
+
+    def get_live(self, profile: Optional[str] = None) -> Tuple[str, Any]:
+        """(version, retriever) of the live knowledge base, read together so a swap can't pair one build's version with another's retriever."""
+        if self._retriever is None:
+            self._build()
+        with self._swap_lock:
+            version, retriever = self.version, self._retriever
+        return version, self._for_profile(retriever, profile)
+
+    def _for_profile(self, retriever, profile: Optional[str]):
+        if profile is None:
+            return retriever
+        cached = self._profiled.get(profile)
+        if cached is None or cached[0] is not retriever:
+            from retrieval_profiles import apply_profile, get_profile
+            # built once per knowledge base; a concurrent first call may build it twice, harmlessly
+            cached = (retriever, apply_profile(retriever, get_profile(profile)))
+            self._profiled[profile] = cached
+        return cached[1]
+
+    def _build(self) -> None:
+        with self._lock:
+            if self._retriever is not None:
+                return
+            self.refresh()
+
+    def refresh(self, directory_path: str | Path | None = None, force: bool = False) -> bool:
+        """
+        Bring the live knowledge base in line with the PDFs on disk, or switch it to the PDFs
+        of `directory_path`.
+
+        Only added or changed PDFs are parsed (all of them when `force`d); chunks whose text is
+        unchanged reuse their vectors from the snapshot, so only affected pages are embedded. The
+        new retriever is built on the side and swapped in at the end. Build time and memory are
+        kept in `last_build`. Returns True if a new build went live.
+        """
+        # heavy imports stay out of module import so importing the graph stays cheap
+        from knowledge_base import parse_files, assemble_retriever, deduplicate, embedding_model_key
+        from chunk_store import ChunkStore
+        from kb_snapshot import build_indexes, kb_files
+        from menu_index import MenuIndex
+
+        with self._lock:
+            directory_path = str(directory_path or self.directory_path)
+            if not os.path.isdir(directory_path):
+                raise FileNotFoundError(f"Knowledge base directory not found: {directory_path}")
+            files = kb_files(directory_path)
+            moved = directory_path != self.directory_path
+            live_files = {} if force or moved else self._files
+            if self._retriever is not None and files == live_files:
+                return False
+
+            changed = [f for f in files if live_files.get(f) != files[f]]
+            removed = [f for f in live_files if f not in files]
+            if self._retriever is not None:
+                print(f"[i] Knowledge base changed: {len(changed)} added/changed, {len(removed)} removed PDFs")
+
+            started, previous = time.perf_counter(), self.version
+            with PeakMemory() as memory:
+                # unchanged PDFs keep their chunks, packed so they cost no Python objects while live
+                docs_by_file = {f: self._docs_by_file[f] for f in files if f not in changed}
+                menu_by_file = {f: self._menu_by_file[f] for f in files if f not in changed}
+                parsed, menus = parse_files([os.path.join(directory_path, f) for f in changed])
+                for filename in changed:
+                    docs_by_file[filename] = ChunkStore.from_documents(parsed[os.path.join(directory_path, filename)])
+                    menu_by_file[filename] = menus[os.path.join(directory_path, filename)]
+                del parsed, menus
+                docs = [d for filename in sorted(docs_by_file) for d in docs_by_file[filename]]
+                if KB_DEDUP:
+                    docs = deduplicate(docs)
+
+                menu = MenuIndex(
+                    [item for filename in sorted(menu_by_file) for item in menu_by_file[filename]],
+                    fuzzy_cutoff=MENU_FUZZY_CUTOFF,
+                )
+
+                embeddings, cross_encoder = self.get_models()
+                vector_store, bm25_retriever, version = build_indexes(
+                    docs, embeddings, directory_path, embedding_model_key(embeddings), bm25_k=5
+                )
+                retriever = assemble_retriever(vector_store, bm25_retriever, cross_encoder)
+            build_s = time.perf_counter() - started
+            docs = bm25_retriever.docs   # chunk store of the snapshot; the parsed Documents are dropped
+            print(f"[i] Knowledge base {version} ready ({vector_store.index.ntotal} vectors, {len(menu)} menu items) "
+                  f"in {build_s:.1f}s, memory peak {memory.peak_mb:.0f} MB (+{memory.peak_mb - memory.start_mb:.0f} MB)")
+
+            # swap: docs first, retriever last, so a reader that sees the new retriever sees everything
+            old_retriever = self._retriever
+            self.directory_path = directory_path
+            self._files = files
+            self._docs_by_file = docs_by_file
+            self._docs = docs
+            self._menu_by_file = menu_by_file
+            self._menu = menu
+            with self._swap_lock:
+                self.version = version
+                self._retriever = retriever
+            self._profiled = {}   # profile copies reference the old retriever's indexes
+            self.last_build = {
+                "version": version,
+                "previous_version": previous,
+                "directory": directory_path,
+                "changed_files": len(changed),
+                "removed_files": len(removed),
+                "vectors": vector_store.index.ntotal,
+                "build_s": round(build_s, 3),
+                "rss_start_mb": round(memory.start_mb, 1),
+                "rss_peak_mb": round(memory.peak_mb, 1),
+                "rss_end_mb": round(memory.end_mb, 1),
+                "finished_at": time.time(),
+            }
+
+        for callback in self._listeners:
+            callback(version)
+        if old_retriever is not None:
+            # freed once the queries still running on it return
+            weakref.finalize(old_retriever, print, f"[i] Knowledge base {previous} released")
+            del old_retriever
+            gc.collect()
+        return True
+
+
+# process-wide registry
+registry = KnowledgeBaseRegistry()
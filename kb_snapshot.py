@@ -0,0 +1,305 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from ann_index import apply_search_params, build_faiss_index, index_config, search_params
+from bm25_index import BM25Index, SparseBM25Retriever
+from chunk_store import ChunkDocstore, ChunkStore, write_chunk_store
+from config import KB_SNAPSHOT_DIR, KB_SNAPSHOT_KEEP, KB_EMBED_BATCH_SIZE, KB_MMAP
+
+try:
+    import fcntl
+except ImportError:     # Windows: no cross-process build lock
+    fcntl = None
+
+# Bump whenever the on-disk layout (or what goes into it) changes
+SNAPSHOT_FORMAT = 3
+
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+BM25_DIR = "bm25"
+VECTORS_FILE = "vectors.npy"
+LOCK_FILE = ".build.lock"
+
+
+def file_checksum(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file's bytes, read in chunks so large PDFs don't have to fit in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def kb_files(directory_path: str | Path) -> Dict[str, str]:
+    """Map every PDF in the knowledge base directory to its checksum."""
+    files = {}
+    for filename in sorted(os.listdir(directory_path)):
+        file_path = os.path.join(directory_path, filename)
+        if os.path.isfile(file_path) and filename.endswith(".pdf"):
+            files[filename] = file_checksum(file_path)
+    return files
+
+
+def kb_version(files: Dict[str, str], model_id: str, index_spec: Optional[dict] = None) -> str:
+    """
+    Version key of a knowledge base build: hash of the PDF checksums, the embedding model id,
+    the FAISS index type/parameters and the snapshot format.
+    Any change to one of them produces a new snapshot directory.
+    """
+    payload = json.dumps(
+        {"format": SNAPSHOT_FORMAT, "model": model_id, "index": index_spec or index_config(), "files": files},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def docs_digest(docs: List[Document]) -> str:
+    """Digest of chunk texts + metadata, used to detect a changed splitting of unchanged PDFs."""
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_manifest(snapshot_dir: Path) -> Optional[dict]:
+    try:
+        with open(snapshot_dir / MANIFEST_FILE, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_index(path: Path, mmap: bool = KB_MMAP):
+    """
+    Memory-map the FAISS index read-only, so every worker shares one copy in the page cache.
+    IO_FLAG_MMAP_IFC maps the vectors of flat, HNSW and IVF indexes (plain IO_FLAG_MMAP still
+    copies flat vectors into RAM); older FAISS builds fall back to IO_FLAG_MMAP, then to a read.
+    """
+    flags = [faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY]
+    if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        flags.insert(0, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    for flag in flags if mmap else []:
+        try:
+            return faiss.read_index(str(path), flag)
+        except RuntimeError:
+            continue
+    return faiss.read_index(str(path))
+
+
+@contextlib.contextmanager
+def snapshot_lock():
+    """Cross-process lock, so of several workers starting at once only one builds a snapshot (or its FAQ table)."""
+    KB_SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    with open(KB_SNAPSHOT_DIR / LOCK_FILE, "a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def load_snapshot(
+    version: str,
+    embeddings,
+    docs: Optional[List[Document]] = None,
+    bm25_k: int = 5,
+    mmap: bool = KB_MMAP,
+) -> Optional[Tuple[FAISS, SparseBM25Retriever, ChunkStore]]:
+    """
+    Load the snapshot saved for `version`.
+    Returns (vector_store, bm25_retriever, chunks) or None if there is no usable snapshot.
+    If `docs` is given, the snapshot is only used when it was built from exactly those chunks.
+    With `mmap` the FAISS vectors and chunk texts are memory-mapped read-only instead of copied
+    into this process.
+    """
+    snapshot_dir = KB_SNAPSHOT_DIR / version
+    manifest = _read_manifest(snapshot_dir)
+    if manifest is None or manifest.get("format") != SNAPSHOT_FORMAT:
+        return None
+    if docs is not None and manifest.get("docs_digest") != docs_digest(docs):
+        print(f"[i] Snapshot {version} was built from different chunks, rebuilding")
+        return None
+
+    try:
+        index = _read_index(snapshot_dir / INDEX_FILE, mmap=mmap)
+        apply_search_params(index, search_params())
+        chunks = ChunkStore.open(snapshot_dir, mmap=mmap)
+        bm25_index = BM25Index.load(snapshot_dir / BM25_DIR, mmap=mmap)
+    except (OSError, RuntimeError, ValueError, KeyError, EOFError) as e:
+        print(f"[!] Could not load snapshot {version}: {e}")
+        return None
+    if len(chunks) != index.ntotal:
+        print(f"[!] Snapshot {version} has {index.ntotal} vectors for {len(chunks)} chunks, rebuilding")
+        return None
+
+    # FAISS row i <-> docstore id str(i) <-> chunk i
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=ChunkDocstore(chunks),
+        index_to_docstore_id={i: str(i) for i in range(len(chunks))},
+    )
+    bm25_retriever = SparseBM25Retriever(index=bm25_index, docs=chunks, k=bm25_k)
+    return vector_store, bm25_retriever, chunks
+
+
+def _previous_vectors(model_id: str) -> Dict[str, np.ndarray]:
+    """Collect text-hash -> vector from older snapshots built with the same embedding model."""
+    reuse: Dict[str, np.ndarray] = {}
+    if not KB_SNAPSHOT_DIR.is_dir():
+        return reuse
+    for snapshot_dir in KB_SNAPSHOT_DIR.iterdir():
+        manifest = _read_manifest(snapshot_dir)
+        if not manifest or manifest.get("model") != model_id:
+            continue
+        try:
+            vectors = np.load(snapshot_dir / VECTORS_FILE, mmap_mode="r")
+        except (OSError, ValueError):
+            continue
+        for row, h in enumerate(manifest.get("text_hashes", [])):
+            if h not in reuse and row < len(vectors):
+                reuse[h] = vectors[row]
+    return reuse
+
+
+def _prune_snapshots(keep: int = KB_SNAPSHOT_KEEP) -> None:
+    dirs = [d for d in KB_SNAPSHOT_DIR.iterdir() if d.is_dir() and (d / MANIFEST_FILE).exists()]
+    dirs.sort(key=lambda d: (d / MANIFEST_FILE).stat().st_mtime, reverse=True)
+    for old in dirs[keep:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def save_snapshot(
+    version: str,
+    model_id: str,
+    files: Dict[str, str],
+    docs: List[Document],
+    vectors: np.ndarray,
+    vector_store: FAISS,
+    bm25_retriever: SparseBM25Retriever,
+    index_spec: Optional[dict] = None,
+) -> Path:
+    """Write a snapshot into a temp dir and rename it into place, so readers never see half a snapshot."""
+    KB_SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    final_dir = KB_SNAPSHOT_DIR / version
+    tmp_dir = KB_SNAPSHOT_DIR / f".{version}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    faiss.write_index(vector_store.index, str(tmp_dir / INDEX_FILE))
+    write_chunk_store(tmp_dir, docs)
+    bm25_retriever.index.save(tmp_dir / BM25_DIR)
+    np.save(tmp_dir / VECTORS_FILE, vectors)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "model": model_id,
+        "index": index_spec,
+        "files": files,
+        "docs_digest": docs_digest(docs),
+        "text_hashes": [text_hash(d.page_content) for d in docs],
+        "created_at": time.time(),
+    }
+    with open(tmp_dir / MANIFEST_FILE, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh)
+
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    _prune_snapshots()
+    return final_dir
+
+
+def build_indexes(
+    docs: List[Document],
+    embeddings,
+    directory_path: str | Path,
+    model_id: str,
+    bm25_k: int = 5,
+    index_spec: Optional[dict] = None,
+) -> Tuple[FAISS, SparseBM25Retriever, str]:
+    """
+    Return (vector_store, bm25_retriever, version) for `docs`.
+
+    - If a snapshot for the current PDFs + embedding model exists, it is loaded from disk.
+    - Otherwise only chunks whose text is not found in an older snapshot are embedded,
+      the indexes are built and a new snapshot is saved.
+    Builds are serialised across processes: workers started together wait for the first one
+    and load its snapshot.
+    `index_spec` selects the FAISS index type (default: KB_INDEX_TYPE from config).
+    """
+    index_spec = index_spec or index_config()
+    files = kb_files(directory_path)
+    version = kb_version(files, model_id, index_spec)
+
+    loaded = load_snapshot(version, embeddings, docs=docs, bm25_k=bm25_k)
+    if loaded is None:
+        with snapshot_lock():
+            loaded = load_snapshot(version, embeddings, docs=docs, bm25_k=bm25_k)
+            if loaded is None:
+                _build_snapshot(version, files, docs, embeddings, model_id, bm25_k, index_spec)
+                loaded = load_snapshot(version, embeddings, docs=docs, bm25_k=bm25_k)
+    if loaded is None:
+        raise RuntimeError(f"Knowledge base snapshot {version} could not be loaded after building it")
+    vector_store, bm25_retriever, _ = loaded
+    print(f"[i] Loaded knowledge base snapshot {version} ({vector_store.index.ntotal} vectors)")
+    return vector_store, bm25_retriever, version
+
+
+def _build_snapshot(
+    version: str,
+    files: Dict[str, str],
+    docs: List[Document],
+    embeddings,
+    model_id: str,
+    bm25_k: int,
+    index_spec: dict,
+) -> None:
+    """Embed, index and save a new snapshot; the caller loads it back (memory-mapped)."""
+    texts = [doc.page_content for doc in docs]
+    reuse = _previous_vectors(model_id)
+    missing = [i for i, t in enumerate(texts) if text_hash(t) not in reuse]
+    print(f"[i] Building {index_spec['type']} snapshot {version}: embedding {len(missing)} of {len(texts)} chunks")
+
+    fresh = {}
+    for start in range(0, len(missing), KB_EMBED_BATCH_SIZE):
+        batch = missing[start:start + KB_EMBED_BATCH_SIZE]
+        fresh.update(zip(batch, embeddings.embed_documents([texts[i] for i in batch])))
+    vectors = np.asarray(
+        [fresh[i] if i in fresh else reuse[text_hash(t)] for i, t in enumerate(texts)],
+        dtype=np.float32,
+    )
+
+    # FAISS row i <-> docstore id str(i) <-> docs[i]
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=build_faiss_index(vectors, index_spec),
+        docstore=InMemoryDocstore({str(i): doc for i, doc in enumerate(docs)}),
+        index_to_docstore_id={i: str(i) for i in range(len(docs))},
+    )
+    bm25_retriever = SparseBM25Retriever.from_texts(
+        texts,
+        metadatas=[doc.metadata for doc in docs],
+        k=bm25_k,
+    )
+
+    save_snapshot(version, model_id, files, docs, vectors, vector_store, bm25_retriever, index_spec)
@@ -0,0 +1,67 @@
+import threading
+from typing import Optional
+
+from watchdog.events import (
+    FileCreatedEvent, FileDeletedEvent, FileModifiedEvent, FileMovedEvent, FileSystemEvent, FileSystemEventHandler,
+)
+from watchdog.observers import Observer
+
+from kb_registry import KnowledgeBaseRegistry
+
+# events that can change a PDF; open / close-without-write events come from reads, including the
+# checksumming a refresh does itself, and must not schedule another refresh
+CHANGE_EVENTS = (FileCreatedEvent, FileModifiedEvent, FileMovedEvent, FileDeletedEvent)
+
+
+class KnowledgeBaseWatcher(FileSystemEventHandler):
+    """
+    Watches the knowledge base directory and refreshes the registry when PDFs are added,
+    changed or removed.
+
+    Events are debounced (a copy of a large PDF fires many modify events) and the refresh runs
+    on a background thread, so requests keep being served from the current retriever until the
+    new one is swapped in.
+    """
+
+    def __init__(self, registry: KnowledgeBaseRegistry, debounce_s: float = 2.0):
+        self.registry = registry
+        self.debounce_s = debounce_s
+        self._observer: Optional[Observer] = None
+        self._timer: Optional[threading.Timer] = None
+        self._timer_lock = threading.Lock()
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory or not isinstance(event, CHANGE_EVENTS):
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        if not any(str(p).endswith(".pdf") for p in paths if p):
+            return
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce_s, self._refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _refresh(self) -> None:
+        try:
+            self.registry.refresh()
+        except Exception as e:
+            # keep serving the current knowledge base; the next change retries
+            print(f"[!] Knowledge base refresh failed, keeping version {self.registry.version}: {e}")
+
+    def start(self) -> None:
+        self._observer = Observer()
+        self._observer.schedule(self, self.registry.directory_path, recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+        print(f"[i] Watching {self.registry.directory_path} for knowledge base changes")
+
+    def stop(self) -> None:
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
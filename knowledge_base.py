@@ -1,88 +1,238 @@
+import functools
 import os
-from langchain_community.document_loaders import PyPDFLoader
+from typing import Callable
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_text_splitters import MarkdownHeaderTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_community.retrievers.bm25 import BM25Retriever
 from langchain_classic.retrievers import EnsembleRetriever, ContextualCompressionRetriever
 from langchain_community.cross_encoders import HuggingFaceCrossEncoder
 from langchain_classic.retrievers.document_compressors import CrossEncoderReranker
 from pathlib import Path
 from huggingface_hub import snapshot_download
 from get_models import ensure_model_dir
+from kb_snapshot import build_indexes, file_checksum
+from doc_cache import load_menu, load_parsed, save_menu, save_parsed
+from chunking import chunk_stats, rechunk
+from dedup import dedup_documents, format_report
+from pdf_ingest import iter_page_batches, pdf_files, split_pages
+from menu_index import parse_menu
+from batching import BatchingCrossEncoder, BatchingEmbeddings
+from adaptive_rerank import AdaptiveRerankRetriever
+from hybrid_retriever import HybridRRFRetriever
+from langchain_core.retrievers import BaseRetriever
+from config import (
+    KB_DIR, EMBEDDING_MODEL_ID, EMBEDDING_MODEL_DIR, RERANKER_MODEL_ID, RERANKER_MODEL_DIR,
+    RERANK_BATCHING, RERANK_MAX_BATCH_SIZE, RERANK_MAX_WAIT_MS,
+    EMBED_BATCHING, EMBED_MAX_BATCH_SIZE, EMBED_MAX_WAIT_MS, EMBED_QUERY_CACHE_SIZE,
+    KB_PARSE_WORKERS, KB_PARSE_PAGES_PER_TASK, KB_PARSE_MIN_PARALLEL_PAGES, KB_PARSED_CACHE,
+    KB_CHUNK_MERGE, KB_CHUNK_TARGET_TOKENS, KB_CHUNK_MAX_TOKENS, KB_CHUNK_OVERLAP_TOKENS,
+    KB_DEDUP, KB_DEDUP_THRESHOLD, KB_DEDUP_NUM_PERM, KB_DEDUP_BANDS,
+    HYBRID_NATIVE_RRF, HYBRID_VECTOR_K,
+    RERANK_ADAPTIVE, RERANK_AGREEMENT_K, RERANK_SKIP_OVERLAP, RERANK_SKIP_MARGIN,
+    RERANK_SHRINK_OVERLAP, RERANK_SHRINK_TOP,
+    EMBEDDING_BACKEND, RERANKER_BACKEND, MODEL_ONNX_QUANT_CONFIG
+)
 
 MODELS = {
-    "BAAI/bge-reranker-base": Path("models/BAAI_bge_reranker"),
-    "sentence-transformers/all-mpnet-base-v2": Path("models/all-mpnet-base-v2"),
+    RERANKER_MODEL_ID: RERANKER_MODEL_DIR,
+    EMBEDDING_MODEL_ID: EMBEDDING_MODEL_DIR,
 }
 
-def load_documents(directory_path: str) -> list:
-    docs = []
-
-    # Define which headers to capture (## and ### for your case)
-    headers_to_split_on = [
-        ("#", "h1"),
-        ("##", "h2"),
-        ("###", "h3")
-    ]
-
-    # Loop through files
-    for filename in os.listdir(directory_path):
-        file_path = os.path.join(directory_path, filename)
-        if os.path.isfile(file_path) and filename.endswith(".pdf"):
-            loader = PyPDFLoader(file_path)
-            pages = loader.load()
-
-            for page in pages:
-                text = page.page_content
-
-                # Use MarkdownHeaderTextSplitter
-                splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers_to_split_on)
-                split_docs = splitter.split_text(text)
-
-                # Add metadata
-                for d in split_docs:
-                    d.metadata.update({
-                        "source": f"{filename} (page {page.metadata.get('page', 'unknown')})"
-                    })
-
-                docs.extend(split_docs)
-
+def parse_files(file_paths: list, workers: int = KB_PARSE_WORKERS, rechunk_docs: bool = KB_CHUNK_MERGE) -> tuple:
+    """
+    Parse PDFs, split every page on its markdown headers and extract their menu tables.
+    Returns ({file_path: chunks}, {file_path: MenuItems}); pages of all files share one worker pool
+    and the menu is parsed from the same page text, so every PDF is read once.
+    PDFs whose checksum is in the parsed-document cache are not parsed again.
+    With `rechunk_docs` small sibling sections are merged and oversized ones split (see chunking).
+    """
+    docs_by_file = {file_path: [] for file_path in file_paths}
+    menu_by_file = {}
+    checksums = {}
+    to_parse = list(file_paths)
+    if KB_PARSED_CACHE:
+        to_parse = []
+        for file_path in file_paths:
+            checksums[file_path] = file_checksum(file_path)
+            filename = os.path.basename(file_path)
+            cached = load_parsed(checksums[file_path], filename)
+            menu = load_menu(checksums[file_path], filename)
+            if cached is None or menu is None:
+                to_parse.append(file_path)
+            else:
+                docs_by_file[file_path], menu_by_file[file_path] = cached, menu
+        if file_paths:
+            print(f"[i] Parsed-document cache: {len(file_paths) - len(to_parse)}/{len(file_paths)} PDFs reused")
+
+    page_text = {file_path: [] for file_path in to_parse}
+    for file_path, pages in iter_page_batches(
+        to_parse,
+        workers=workers,
+        pages_per_task=KB_PARSE_PAGES_PER_TASK,
+        min_parallel_pages=KB_PARSE_MIN_PARALLEL_PAGES,
+    ):
+        docs_by_file[file_path].extend(split_pages(file_path, pages))
+        page_text[file_path].extend(text for _, text in pages)
+    for file_path, texts in page_text.items():
+        menu_by_file[file_path] = parse_menu("\n".join(texts), source=os.path.basename(file_path))
+    del page_text
+
+    if KB_PARSED_CACHE:
+        for file_path in to_parse:
+            save_parsed(checksums[file_path], docs_by_file[file_path])
+            save_menu(checksums[file_path], menu_by_file[file_path])
+
+    if rechunk_docs and file_paths:
+        count_tokens = get_chunk_token_counter()
+        before = chunk_stats([d for docs in docs_by_file.values() for d in docs], count_tokens)
+        for file_path, docs in docs_by_file.items():
+            docs_by_file[file_path] = rechunk(
+                docs, count_tokens, KB_CHUNK_TARGET_TOKENS, KB_CHUNK_MAX_TOKENS, KB_CHUNK_OVERLAP_TOKENS
+            )
+        after = chunk_stats([d for docs in docs_by_file.values() for d in docs], count_tokens)
+        print(f"[i] Re-chunked {before['chunks']} -> {after['chunks']} chunks, tokens "
+              f"p50 {before.get('tokens_p50')} -> {after.get('tokens_p50')}, max {after.get('tokens_max')}")
+    return docs_by_file, menu_by_file
+
+def load_files(file_paths: list, workers: int = KB_PARSE_WORKERS, rechunk_docs: bool = KB_CHUNK_MERGE) -> dict:
+    """{file_path: chunks} of the PDFs (see parse_files)."""
+    return parse_files(file_paths, workers=workers, rechunk_docs=rechunk_docs)[0]
+
+def load_pdf(file_path: str, workers: int = KB_PARSE_WORKERS) -> list:
+    return load_files([file_path], workers=workers)[file_path]
+
+def deduplicate(docs: list) -> list:
+    """Fold near-duplicate chunks of the whole knowledge base into one (see dedup)."""
+    docs, report = dedup_documents(
+        docs, KB_DEDUP_THRESHOLD, KB_DEDUP_NUM_PERM, KB_DEDUP_BANDS, get_chunk_token_counter()
+    )
+    print(format_report(report))
     return docs
 
-def setup_retriever(docs: list) -> ContextualCompressionRetriever:
+def load_documents(directory_path: str, workers: int = KB_PARSE_WORKERS, dedup: bool = KB_DEDUP) -> list:
+    # Pages are parsed in parallel across processes for large knowledge bases
+    docs_by_file = load_files(pdf_files(directory_path), workers=workers)
+    docs = [d for docs in docs_by_file.values() for d in docs]
+    # boilerplate repeats across pages and files, so duplicates are folded over the whole set
+    return deduplicate(docs) if dedup else docs
+
+@functools.lru_cache(maxsize=1)
+def get_chunk_token_counter() -> Callable[[str], int]:
+    """
+    Word-piece count of a text with the embedding model's own tokenizer, loaded from its local
+    model dir. Chunk sizes, and so the chunks, docs_digest and snapshot, are the same on every
+    machine with the model, online or not; without the tokenizer ingestion fails instead of
+    silently chunking differently.
+    """
+    from transformers import AutoTokenizer
+
+    local, _ = ensure_model_dir(EMBEDDING_MODEL_ID, EMBEDDING_MODEL_DIR)
+    tokenizer = AutoTokenizer.from_pretrained(str(local))
+    return lambda text: len(tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"])
+
+def load_hf_model(model_cls, repo_id: str, model_dir: Path, backend: str = "torch", kind: str = "embedding"):
+    """
+    Build `model_cls` (HuggingFaceEmbeddings / HuggingFaceCrossEncoder) from its local model dir
+    on the requested backend: torch, onnx or onnx-int8. Any ONNX problem falls back to torch.
+    """
     # change force=True if you want to force re-download
-    mpnet_local, _ = ensure_model_dir("sentence-transformers/all-mpnet-base-v2", Path("models/all-mpnet-base-v2"))
-    reranker_local, _ = ensure_model_dir("BAAI/bge-reranker-base", Path("models/BAAI_bge_reranker"))
-
-    # pass those local paths into your constructors:
-    embeddings = HuggingFaceEmbeddings(model_name=str(mpnet_local))
-    cross_encoder = HuggingFaceCrossEncoder(model_name=str(reranker_local))
-    vector_store = FAISS.from_documents(docs, embeddings)
-    print("Total vectors in vector_store:",vector_store.index.ntotal)
-
-    bm25_retriever = BM25Retriever.from_texts(
-        [doc.page_content for doc in docs],
-        metadatas=[doc.metadata for doc in docs],
-        k=5
+    local, onnx_file = ensure_model_dir(
+        repo_id, model_dir, backend=backend, onnx_kind=kind, quant_config=MODEL_ONNX_QUANT_CONFIG
     )
-    vect_retriever = vector_store.as_retriever(k=20)
-
-    hybrid_retriever = EnsembleRetriever(
-        retrievers=[bm25_retriever, vect_retriever],
-        weights=[0.5, 0.5],  # adjust to balance keyword vs. semantic
-        c=60                  # RRF constant
+    if onnx_file:
+        try:
+            model = model_cls(
+                model_name=str(local), model_kwargs={"backend": "onnx", "model_kwargs": {"file_name": onnx_file}}
+            )
+            print(f"[i] Loaded {repo_id} with the {backend} backend ({onnx_file})")
+            return model
+        except Exception as e:
+            print(f"[!] Could not load {repo_id} with the {backend} backend, falling back to torch: {e}")
+            local, _ = ensure_model_dir(repo_id, model_dir)
+    return model_cls(model_name=str(local))
+
+def embedding_model_key(embeddings) -> str:
+    """
+    Embedding model id used to version snapshots. ONNX / int8 vectors differ slightly from the
+    torch ones, so they get their own snapshots (and never reuse torch vectors).
+    """
+    inner = getattr(embeddings, "embeddings", embeddings)
+    kwargs = getattr(inner, "model_kwargs", None) or {}
+    if kwargs.get("backend", "torch") == "torch":
+        return EMBEDDING_MODEL_ID
+    return f"{EMBEDDING_MODEL_ID}@{kwargs['backend']}:{kwargs.get('model_kwargs', {}).get('file_name', '')}"
+
+def load_models():
+    """Load the embedding model and the cross-encoder from their local model dirs."""
+    embeddings = load_hf_model(
+        HuggingFaceEmbeddings, EMBEDDING_MODEL_ID, EMBEDDING_MODEL_DIR, EMBEDDING_BACKEND, "embedding"
     )
-
-    #cross_encoder = HuggingFaceCrossEncoder(model_name="models/BAAI_bge_reranker")
+    if EMBED_BATCHING:
+        # concurrent query embeddings share forward passes, repeated queries skip the encoder
+        embeddings = BatchingEmbeddings(
+            embeddings,
+            max_batch_size=EMBED_MAX_BATCH_SIZE,
+            max_wait_ms=EMBED_MAX_WAIT_MS,
+            cache_size=EMBED_QUERY_CACHE_SIZE,
+        )
+    cross_encoder = load_hf_model(
+        HuggingFaceCrossEncoder, RERANKER_MODEL_ID, RERANKER_MODEL_DIR, RERANKER_BACKEND, "cross-encoder"
+    )
+    if RERANK_BATCHING:
+        # concurrent rerank calls share forward passes
+        cross_encoder = BatchingCrossEncoder(
+            cross_encoder, max_batch_size=RERANK_MAX_BATCH_SIZE, max_wait_ms=RERANK_MAX_WAIT_MS
+        )
+    return embeddings, cross_encoder
+
+def assemble_retriever(
+    vector_store, bm25_retriever, cross_encoder, adaptive: bool = RERANK_ADAPTIVE, native_rrf: bool = HYBRID_NATIVE_RRF
+) -> BaseRetriever:
+    """Hybrid BM25 + FAISS retrieval followed by (adaptive) cross-encoder reranking."""
+    if native_rrf:
+        # both lookups at once, fused by chunk id, candidates carry their scores
+        hybrid_retriever = HybridRRFRetriever(
+            bm25=bm25_retriever,
+            vector_store=vector_store,
+            vector_k=HYBRID_VECTOR_K,
+            weights=[0.5, 0.5],  # adjust to balance keyword vs. semantic
+            c=60                  # RRF constant
+        )
+    else:
+        vect_retriever = vector_store.as_retriever(search_kwargs={"k": HYBRID_VECTOR_K})
+
+        hybrid_retriever = EnsembleRetriever(
+            retrievers=[bm25_retriever, vect_retriever],
+            weights=[0.5, 0.5],  # adjust to balance keyword vs. semantic
+            c=60                  # RRF constant
+        )
 
     reranker = CrossEncoderReranker(model=cross_encoder, top_n=10)
 
+    if adaptive:
+        # skip / shrink the cross-encoder when BM25 and FAISS already agree on the top hits
+        return AdaptiveRerankRetriever(
+            ensemble=hybrid_retriever,
+            reranker=reranker,
+            agreement_k=RERANK_AGREEMENT_K,
+            skip_overlap=RERANK_SKIP_OVERLAP,
+            skip_margin=RERANK_SKIP_MARGIN,
+            shrink_overlap=RERANK_SHRINK_OVERLAP,
+            shrink_top=RERANK_SHRINK_TOP,
+        )
+
     retriever = ContextualCompressionRetriever(
         base_compressor=reranker,
         base_retriever=hybrid_retriever
     )
     return retriever
 
-docs = load_documents("knowledge_base")
-retriever = setup_retriever(docs)
\ No newline at end of file
+def setup_retriever(docs: list, directory_path: str = str(KB_DIR), embeddings=None, cross_encoder=None) -> BaseRetriever:
+    if embeddings is None or cross_encoder is None:
+        embeddings, cross_encoder = load_models()
+
+    # FAISS + BM25 are loaded from the on-disk snapshot when the PDFs and model are unchanged
+    vector_store, bm25_retriever, _ = build_indexes(
+        docs, embeddings, directory_path, embedding_model_key(embeddings), bm25_k=5
+    )
+    print("Total vectors in vector_store:",vector_store.index.ntotal)
+
+    return assemble_retriever(vector_store, bm25_retriever, cross_encoder)
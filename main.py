@@ -1,11 +1,21 @@
 # main.py
+import hmac
+import os
 import uuid
 import asyncio
+import threading
+import time
 from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect, Header
 from pydantic import BaseModel
 from state import MyState
-from knowledge_base import setup_retriever, load_documents
+from kb_registry import registry
+from nodes.general_nodes import retrieval_cache, answer_cache
+from faq_table import faq_table
+from batching import BatchingCrossEncoder, BatchingEmbeddings
+from adaptive_rerank import AdaptiveRerankRetriever
+from kb_watcher import KnowledgeBaseWatcher
+from config import KB_WATCH, KB_WATCH_DEBOUNCE_S, ADMIN_TOKEN, KB_ROOT
 from get_models import prepare_and_load_whisper, prepare_and_load_whisper_with_gpu
 from langchain_core.messages import HumanMessage, SystemMessage
 from graph_builder import compiled
@@ -61,6 +71,16 @@ class QueryResponse(BaseModel):
     result: Dict[str, Any]
 
 
+class ReloadRequest(BaseModel):
+    directory: Optional[str] = None   # switch to another knowledge_base/ directory; default: the live one
+    force: bool = False               # re-parse every PDF even if unchanged
+
+
+# Background knowledge base rebuild started from the admin endpoint (one at a time)
+_reload_lock = threading.Lock()
+_reload_status: Dict[str, Any] = {"status": "idle"}
+
+
 @app.on_event("startup")
 async def startup_event():
     """
@@ -70,10 +90,11 @@ async def startup_event():
       - compiled graph (already imported above as compiled)
     This keeps model/KB warm for all incoming requests.
     """
-    # Load documents and retriever (blocking I/O — run in thread)
+    # Build documents and retriever once through the shared registry (blocking I/O — run in thread)
+    # The graph nodes use the very same instances.
     loop = asyncio.get_running_loop()
-    docs = await loop.run_in_executor(None, load_documents, "knowledge_base")
-    retriever = await loop.run_in_executor(None, setup_retriever, docs)
+    retriever = await loop.run_in_executor(None, registry.get_retriever)
+    docs = registry.get_docs()
 
     whisper_model = await loop.run_in_executor(
         None,
@@ -90,9 +111,21 @@ async def startup_event():
     app.state.retriever = retriever
     app.state.compiled = compiled  # the graph object you already have
 
+    # Keep app.state pointing at the live knowledge base when the watcher swaps in a rebuild
+    def _on_kb_swap(version):
+        app.state.docs = registry.get_docs()
+        app.state.retriever = registry.get_retriever()
+    registry.add_listener(_on_kb_swap)
+
+    app.state.kb_watcher = None
+    if KB_WATCH:
+        app.state.kb_watcher = KnowledgeBaseWatcher(registry, debounce_s=KB_WATCH_DEBOUNCE_S)
+        app.state.kb_watcher.start()
+
     # Optional: create a default session so app is "warm"
+    # (sessions never hold the retriever: the nodes read the live one from the registry,
+    # so a swapped-out knowledge base is not kept alive by old sessions)
     default_state = create_initial_state()
-    default_state["retriever"] = retriever
     async with _session_lock:
         default_sid = str(uuid.uuid4())
         _sessions[default_sid] = default_state
@@ -101,11 +134,107 @@ async def startup_event():
     print(f"Startup complete — preloaded docs/retriever. default_session: {default_sid}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    watcher = getattr(app.state, "kb_watcher", None)
+    if watcher is not None:
+        watcher.stop()
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+async def stats():
+    """Counters of the retrieval caches and the embedding/reranker batching."""
+    out = {
+        "knowledge_base_version": registry.version,
+        "caches": {
+            "retrieval": retrieval_cache.stats(),
+            "semantic_answers": answer_cache.stats(),
+            "faq": faq_table.stats(),
+        },
+    }
+    embeddings, cross_encoder = registry.get_models() if registry.version else (None, None)
+    if isinstance(embeddings, BatchingEmbeddings):
+        out["query_embeddings"] = embeddings.stats()
+    if isinstance(cross_encoder, BatchingCrossEncoder):
+        out["rerank_batching"] = cross_encoder.batcher.stats()
+    if isinstance(getattr(app.state, "retriever", None), AdaptiveRerankRetriever):
+        out["adaptive_rerank"] = app.state.retriever.stats()
+    return out
+
+
+def _check_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if not hmac.compare_digest((token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def _kb_directory(directory: Optional[str]) -> Optional[str]:
+    """Validated reload target: None for the live directory, else a real path under KB_ROOT."""
+    if not directory:
+        return None
+    path = os.path.realpath(directory)
+    root = os.path.realpath(KB_ROOT)
+    if os.path.commonpath([path, root]) != root:
+        raise HTTPException(status_code=403, detail=f"Knowledge base directory must be under {KB_ROOT}")
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=404, detail=f"Knowledge base directory not found: {directory}")
+    return None if path == os.path.realpath(registry.directory_path) else path
+
+
+def _reload_knowledge_base(directory: Optional[str], force: bool) -> None:
+    """Build the new knowledge base on this thread; the registry swaps it in (and app.state via its listener)."""
+    watched = registry.directory_path
+    try:
+        swapped = registry.refresh(directory, force=force)
+        _reload_status.update(status="done" if swapped else "unchanged", version=registry.version)
+        watcher = getattr(app.state, "kb_watcher", None)
+        if watcher is not None and registry.directory_path != watched:
+            watcher.stop()
+            watcher.start()
+    except Exception as e:
+        print(f"[!] Knowledge base reload failed, keeping version {registry.version}: {e}")
+        traceback.print_exc()
+        _reload_status.update(status="failed", error=str(e))
+    finally:
+        _reload_status["finished_at"] = time.time()
+        _reload_lock.release()
+
+
+@app.post("/admin/knowledge-base/reload", status_code=202)
+async def reload_knowledge_base(payload: Optional[ReloadRequest] = None,
+                                x_admin_token: Optional[str] = Header(None)):
+    """
+    Rebuild the knowledge base in a background thread and swap it in when ready. Queries keep
+    being served by the current index meanwhile; those in flight at the swap finish on it.
+    Poll GET /admin/knowledge-base/reload for the outcome, build time and memory peak.
+    """
+    _check_admin(x_admin_token)
+    payload = payload or ReloadRequest()
+    directory = _kb_directory(payload.directory)
+    if not _reload_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A knowledge base reload is already running")
+    _reload_status.clear()
+    _reload_status.update(status="running", directory=directory or registry.directory_path,
+                          force=payload.force, previous_version=registry.version, started_at=time.time())
+    threading.Thread(
+        target=_reload_knowledge_base, args=(directory, payload.force), name="kb-reload", daemon=True
+    ).start()
+    return dict(_reload_status)
+
+
+@app.get("/admin/knowledge-base/reload")
+async def reload_knowledge_base_status(x_admin_token: Optional[str] = Header(None)):
+    """State of the last reload plus the live version and its build (time, memory peak)."""
+    _check_admin(x_admin_token)
+    return {**_reload_status, "live_version": registry.version, "last_build": registry.last_build}
+
+
 @app.post("/sessions", response_model=CreateSessionResponse)
 async def create_session():
     sid = str(uuid.uuid4())
@@ -152,9 +281,6 @@ async def run_query(session_id: str, payload: QueryRequest):
     # update the session state with the new input query
     state["input"] = payload.query
 
-    # ensure retriever reference is present for the graph/workflow (some graphs expect it)
-    state.setdefault("retriever", app.state.retriever)
-
     # run compiled.invoke in threadpool (in case it's CPU / blocking IO)
     loop = asyncio.get_running_loop()
     compiled_obj = app.state.compiled
@@ -344,7 +470,6 @@ async def websocket_audio(websocket: WebSocket):
 
                     # update state with transcript
                     state["input"] = transcript
-                    state.setdefault("retriever", app.state.retriever)
 
                     compiled_obj = app.state.compiled
 
@@ -0,0 +1,184 @@
+"""
+Structured menu table extracted from the knowledge base PDFs, for order validation.
+
+The PDFs list menu categories as bullet lists under `## Menu` / `### <category>` and describe
+every item in its own `### <item>` section with a `**Price:** PKR ...` line. The table is parsed
+from the full page text (chunks lose their headers at page breaks) and looked up by exact and
+fuzzy (difflib) name matching, so the order checker only sees the few rows the user mentioned.
+"""
+import difflib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from pdf_ingest import iter_page_batches
+
+PRICE_RE = re.compile(r"\*\*Price:\*\*\s*PKR\s*([\d,]+)")
+# words that don't identify an item on their own
+STOPWORDS = {"a", "an", "and", "as", "for", "in", "of", "on", "or", "the", "to", "with", "served", "side"}
+
+
+def _stem(token: str) -> str:
+    # "teas" -> "tea", "kebabs" -> "kebab"
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, '&' -> 'and', punctuation to spaces: 'Saffron-infused' == 'saffron infused'."""
+    text = text.lower().replace("&", " and ")
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+@dataclass
+class MenuItem:
+    name: str
+    price: Optional[int] = None
+    categories: List[str] = field(default_factory=list)
+    aliases: List[str] = field(default_factory=list)
+    source: str = ""
+
+    def row(self) -> str:
+        price = f"PKR {self.price}" if self.price is not None else "price not listed"
+        return f"- {self.name} | {', '.join(self.categories) or 'Menu'} | {price}"
+
+
+def item_aliases(name: str) -> List[str]:
+    """
+    Names an item can be ordered by: the full name, the name without its parenthetical and a
+    parenthetical that is itself a name ("Stuffed Grape Leaves (Warak Enab)" -> "Warak Enab").
+    """
+    aliases = [name]
+    match = re.match(r"^(.*?)\s*\((.*)\)\s*$", name)
+    if match:
+        base, inner = match.group(1).strip(), match.group(2).strip()
+        aliases.append(base)
+        if inner and inner[0].isupper() and " or " not in inner and not inner.lower().startswith("served"):
+            aliases.append(inner)
+    return list(dict.fromkeys(a for a in aliases if a))
+
+
+def parse_menu(text: str, source: str = "") -> List[MenuItem]:
+    """Menu items of one markdown document: category lists + `### item` sections with a price."""
+    items: Dict[str, MenuItem] = {}
+
+    def get_item(name: str) -> MenuItem:
+        key = normalize_name(name)
+        if key not in items:
+            items[key] = MenuItem(name=name, aliases=item_aliases(name), source=source)
+        return items[key]
+
+    h2 = h3 = ""
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("## "):
+            h2, h3 = line[3:].strip(), ""
+        elif line.startswith("### "):
+            h3 = line[4:].strip()
+        elif not h3:
+            continue
+        elif "menu" in h2.lower() and line.startswith("- "):
+            item = get_item(line[2:].strip())
+            if h3 not in item.categories:
+                item.categories.append(h3)
+        else:
+            price = PRICE_RE.search(line)
+            if price and "menu" not in h2.lower():
+                get_item(h3).price = int(price.group(1).replace(",", ""))
+    return list(items.values())
+
+
+def load_menu_items(file_path: str) -> List[MenuItem]:
+    """Menu items of one PDF, read on its own (ingestion gets them from knowledge_base.parse_files)."""
+    pages = [text for _, batch in iter_page_batches([file_path]) for _, text in batch]
+    return parse_menu("\n".join(pages), source=os.path.basename(file_path))
+
+
+class MenuIndex:
+    """In-memory menu table with exact, fuzzy and partial name lookup."""
+
+    def __init__(self, items: List[MenuItem], fuzzy_cutoff: float = 0.8):
+        # the same item may be described in more than one PDF: keep the first, merge categories
+        merged: Dict[str, MenuItem] = {}
+        for item in items:
+            key = normalize_name(item.name)
+            if key in merged:
+                existing = merged[key]
+                existing.price = existing.price if existing.price is not None else item.price
+                existing.categories += [c for c in item.categories if c not in existing.categories]
+            else:
+                merged[key] = item
+        self.items = list(merged.values())
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._by_alias: Dict[str, MenuItem] = {}
+        for item in self.items:
+            for alias in item.aliases:
+                self._by_alias.setdefault(normalize_name(alias), item)
+        # partial matching uses the short names only ("served as a side with tea" is not a tea)
+        self._tokens = {}
+        for item in self.items:
+            short_names = item.aliases[1:] or item.aliases
+            self._tokens[id(item)] = {
+                _stem(t) for a in short_names for t in normalize_name(a).split() if t not in STOPWORDS
+            }
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def lookup(self, name: str, limit: int = 3) -> List[MenuItem]:
+        """Items for one item name: the exact (normalised) match, else the closest fuzzy matches."""
+        key = normalize_name(name)
+        if key in self._by_alias:
+            return [self._by_alias[key]]
+        close = difflib.get_close_matches(key, list(self._by_alias), n=limit, cutoff=self.fuzzy_cutoff)
+        found: List[MenuItem] = []
+        for alias in close:
+            if not any(item is self._by_alias[alias] for item in found):
+                found.append(self._by_alias[alias])
+        return found
+
+    def match(self, query: str, limit: int = 8) -> List[MenuItem]:
+        """
+        Items mentioned anywhere in a free-form order request, best first:
+        exact name phrases, then fuzzy phrase matches (typos), then partial names ("tea").
+        """
+        words = normalize_name(query).split()
+        text = f" {' '.join(words)} "
+        scores: Dict[int, Tuple[float, MenuItem]] = {}
+
+        def add(item: MenuItem, score: float) -> None:
+            if score > scores.get(id(item), (0.0, None))[0]:
+                scores[id(item)] = (score, item)
+
+        windows: Dict[int, List[str]] = {}
+        matcher = difflib.SequenceMatcher()
+        for alias, item in self._by_alias.items():
+            if f" {alias} " in text:
+                add(item, 3 + len(alias) / 100)
+                continue
+            matcher.set_seq2(alias)
+            n = len(alias.split())
+            for size in {max(1, n - 1), n, n + 1}:
+                if size not in windows:
+                    windows[size] = [" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))]
+                for window in windows[size]:
+                    matcher.set_seq1(window)
+                    # cheap upper bounds first, the full ratio only for plausible windows
+                    if (matcher.real_quick_ratio() >= self.fuzzy_cutoff
+                            and matcher.quick_ratio() >= self.fuzzy_cutoff
+                            and matcher.ratio() >= self.fuzzy_cutoff):
+                        add(item, 2 + matcher.ratio())
+
+        query_tokens = {_stem(w) for w in words if w not in STOPWORDS}
+        for item in self.items:
+            tokens = self._tokens[id(item)]
+            overlap = len(tokens & query_tokens)
+            if overlap:
+                add(item, 1 + overlap / len(tokens))
+
+        ranked = sorted(scores.values(), key=lambda s: -s[0])
+        return [item for _, item in ranked[:limit]]
+
+
+def format_menu_rows(items: List[MenuItem]) -> str:
+    return "\n".join(["Menu item | Category | Price"] + [item.row() for item in items])
@@ -5,6 +5,10 @@ from utils import safe_int, get_conversation_context
 from typing import Dict
 from datetime import datetime
 
+start_booking = StartBooking()
+booking_manager = BookingDetailManager()
+booking_repeater = BookingRepeater()
+
 def start_node_booking(state: MyState) -> Dict:
     """Handles booking initiation or other ambiguious booking related queries"""
     print("\n" + "="*80)
@@ -18,7 +22,6 @@ def start_node_booking(state: MyState) -> Dict:
 
     conversation_history = get_conversation_context(state["messages"])
 
-    start_booking = StartBooking()
     response = start_booking.execute_query(
         query = current_query,
         booking = booking,
@@ -132,7 +135,6 @@ def booking_checker_node(state: MyState) -> Dict:
     booking = state.get("booking", {}) or {}
 
     # Run the BookingDetailManager to extract/merge booking fields
-    booking_manager = BookingDetailManager()
     result = booking_manager.execute_query(
         query=current_query,
         booking=booking,
@@ -210,7 +212,6 @@ def booking_repeater_node(state: MyState) -> Dict:
     current_query = state["input"]
     print(f"PROCESSING: {current_query}")
 
-    booking_repeater = BookingRepeater()
     response = booking_repeater.execute_query(
         "", [], booking=booking
     )
@@ -4,6 +4,9 @@ from models import Customer, Complaint
 from typing import Dict
 from utils import get_conversation_context
 
+classifier = ComplaintClassifier()
+updater = UpdateComplain()
+
 def complaint_customer_check_node(state: MyState) -> Dict:
     print("\n" + "="*80)
     print("👤 COMPLAINT CUSTOMER CHECK")
@@ -22,7 +25,6 @@ def complaint_classifier_node(state: MyState) -> Dict:
     print("🧠 COMPLAINT CLASSIFIER")
     print("="*80)
 
-    classifier = ComplaintClassifier()
     result = classifier.execute_query(
         query=state["input"],
         conversation_history=get_conversation_context(state["messages"])
@@ -38,7 +40,6 @@ def complaint_update_node(state: MyState) -> Dict:
     print("✍️ COMPLAINT UPDATE")
     print("="*80)
 
-    updater = UpdateComplain()
     result = updater.execute_query(
         current_complain=state.get("complaint", ""),
         query=state["input"]
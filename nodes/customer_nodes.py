@@ -5,6 +5,8 @@ from datetime import datetime
 from typing import Dict
 from utils import get_conversation_context
 
+customer_checker = CustomerDetailManager()
+
 def get_customer_node(state: MyState):
     """Prompts user to provide customer details"""
     print("\n" + "="*80)
@@ -36,7 +38,6 @@ def customer_checker_node(state: MyState) -> Dict:
     conversation_history = get_conversation_context(state["messages"])
     customer_details = state['customer']
 
-    customer_checker = CustomerDetailManager()
     response = customer_checker.execute_query(
         query=current_query,
         conversation_history=conversation_history,
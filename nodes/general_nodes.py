@@ -1,9 +1,38 @@
 from state import MyState
 from prompt_templates import Refine_Query, MultiIntentDetector, Information_Retrieval
-from knowledge_base import retriever
+from kb_registry import registry
+from retrieval_cache import TTLLRUCache, normalize_query
+from semantic_cache import SemanticAnswerCache
+from context_builder import build_context, get_token_counter
+from faq_table import faq_table
+from config import (
+    RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL,
+    CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD, CONTEXT_TOKEN_ENCODING,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_SIZE,
+    FAQ_ENABLED
+)
 from utils import get_conversation_context
 from typing import Dict
 
+refiner = Refine_Query()
+intent_detector = MultiIntentDetector()
+information_processor = Information_Retrieval()
+
+# Retrieved documents per (knowledge-base version, retrieval profile, normalised query)
+retrieval_cache = TTLLRUCache(maxsize=RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL)
+# Final information answers matched by query similarity, embedded with the retriever's own embedder
+answer_cache = SemanticAnswerCache(
+    embed_fn=lambda query: registry.get_embeddings().embed_query(query),
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    maxsize=SEMANTIC_CACHE_SIZE,
+)
+# entries of an old index are useless once a new one is live
+registry.add_listener(lambda version: retrieval_cache.clear())
+registry.add_listener(lambda version: answer_cache.clear(version))
+# FAQ answers are regenerated (or loaded from the snapshot) for every new knowledge base
+if FAQ_ENABLED:
+    registry.add_listener(faq_table.on_kb_swap)
+
 
 # NODE DEFINITIONS
 # NODE DEFINITIONS
@@ -18,8 +47,6 @@ def refine_node(state: MyState) -> Dict:
 
     conversation_history = get_conversation_context(state["messages"])
 
-    refiner = Refine_Query()
-
     refined = refiner.execute_query(
         query=user_input,
         conversation_history=conversation_history
@@ -43,8 +70,6 @@ def intent_detection_node(state: MyState) -> Dict:
 
     conversation_history = get_conversation_context(state["messages"])
 
-    intent_detector = MultiIntentDetector()
-
     result = intent_detector.execute_query(
         query=refined_query,
         conversation_history=conversation_history
@@ -73,11 +98,33 @@ def information_node(state: MyState) -> Dict:
     current_query = state["input"]
     print(f"PROCESSING: {current_query}")
 
-    conversation_history = get_conversation_context(state["messages"])
+    # only looked up here, once the supervisor routed to information: booking / order requests
+    # that resemble an FAQ ("How can I book a table?") still reach their own agents
+    faq_answer = faq_table.lookup(current_query) if FAQ_ENABLED else None
+    if faq_answer is not None:
+        print(f"RESPONSE (FAQ): {faq_answer}\n")
+        return {
+            "processed_queries": state["processed_queries"] + [current_query],
+            "query_responses": state["query_responses"] + [faq_answer],
+            "next": "supervisor"
+        }
+
+    query_vector = None
+    if SEMANTIC_CACHE_ENABLED:
+        # the answer below is cached under the version that was live when it was looked up
+        kb_version = registry.get_live()[0]
+        cached_answer, query_vector = answer_cache.lookup(current_query, kb_version)
+        if cached_answer is not None:
+            print(f"RESPONSE (cached): {cached_answer}\n")
+            return {
+                "processed_queries": state["processed_queries"] + [current_query],
+                "query_responses": state["query_responses"] + [cached_answer],
+                "next": "supervisor"
+            }
 
-    context = get_context(current_query)
+    conversation_history = get_conversation_context(state["messages"])
 
-    information_processor = Information_Retrieval()
+    context = get_context(current_query, profile="information")
 
     response = information_processor.execute_query(
         query=current_query,
@@ -87,15 +134,29 @@ def information_node(state: MyState) -> Dict:
 
     print(f"RESPONSE: {response.content}\n")
 
+    if SEMANTIC_CACHE_ENABLED:
+        answer_cache.store(current_query, str(response.content), query_vector, kb_version)
+
     return {
         "processed_queries": state["processed_queries"] + [current_query],
         "query_responses": state["query_responses"] + [str(response.content)],
         "next": "supervisor"
     }
 
-def get_context(current_query):
-    docs = retriever.invoke(current_query)
-    context = "\n".join(doc.page_content for doc in docs)
+def get_context(current_query, profile="information"):
+    """Prompt context for `current_query`, retrieved with the caller's profile (retrieval_profiles)."""
+    version, retriever = registry.get_live(profile)
+    key = (version, profile, normalize_query(current_query))
+    docs = retrieval_cache.get(key)
+    if docs is None:
+        docs = retriever.invoke(current_query)
+        retrieval_cache.put(key, docs)
+    context = build_context(
+        docs,
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        dedup_threshold=CONTEXT_DEDUP_THRESHOLD,
+        count_tokens=get_token_counter(CONTEXT_TOKEN_ENCODING),
+    )
     return context
 
 def customer_details_node(state: MyState) -> Dict:
@@ -4,6 +4,13 @@ from models import Customer, OrderDoc, OrderItem
 from utils import safe_int, safe_float, get_conversation_context
 from typing import Dict
 from nodes.general_nodes import get_context
+from kb_registry import registry
+from menu_index import format_menu_rows
+from config import MENU_INDEX_ENABLED, MENU_MATCH_LIMIT
+
+start_order = StartOrder()
+order_checker = OrderItemChecker()
+order_repeater = OrderRepeater()
 
 def start_node(state: MyState) -> Dict:
     """Handles order initiation or other ambiguious order related queries"""
@@ -18,7 +25,6 @@ def start_node(state: MyState) -> Dict:
 
     conversation_history = get_conversation_context(state["messages"])
 
-    start_order = StartOrder()
     response = start_order.execute_query(
         query = current_query,
         order = order,
@@ -138,12 +144,15 @@ def order_checker_node(state: MyState) -> Dict:
 
     order = state['order']
 
-    # Get menu context (assuming you have this available)
-    menu_context = get_context(current_query)  # Replace with your actual menu retrieval
+    # Only the menu rows the user mentioned; full retrieval when nothing on the menu matches
+    menu_rows = registry.get_menu_index().match(current_query, limit=MENU_MATCH_LIMIT) if MENU_INDEX_ENABLED else []
+    if menu_rows:
+        menu_context = format_menu_rows(menu_rows)
+    else:
+        menu_context = get_context(current_query, profile="order")
 
     print(f"Menu context: {menu_context}")
 
-    order_checker = OrderItemChecker()
     response = order_checker.execute_query(
         query=current_query,
         context=menu_context,
@@ -267,7 +276,6 @@ def order_repeater_node(state: MyState) -> Dict:
     current_query = state["input"]
     print(f"PROCESSING: {current_query}")
 
-    order_repeater = OrderRepeater()
     response = order_repeater.execute_query(
         "", [], order=order
     )
@@ -0,0 +1,110 @@
+"""
+PDF parsing + header splitting, with page text extraction parallelised over a process pool.
+
+Pool workers are spawned and import only this module, so it must stay light: workers only run
+pypdf text extraction (the expensive part) and the parent splits the text with one reused
+splitter (langchain_text_splitters pulls in torch on import).
+"""
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+# Define which headers to capture (## and ### for your case)
+HEADERS_TO_SPLIT_ON = [
+    ("#", "h1"),
+    ("##", "h2"),
+    ("###", "h3")
+]
+
+# (file_path, first_page, last_page_exclusive)
+PageRange = Tuple[str, int, int]
+
+
+@functools.lru_cache(maxsize=1)
+def get_splitter():
+    """One MarkdownHeaderTextSplitter, reused for every page."""
+    from langchain_text_splitters import MarkdownHeaderTextSplitter
+    return MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON)
+
+
+def extract_page_range(task: PageRange) -> List[Tuple[int, str]]:
+    """Text of pages [start, stop) of one PDF, same as PyPDFLoader produces in page mode."""
+    file_path, start, stop = task
+    reader = PdfReader(file_path)
+    return [
+        (page_number, reader.pages[page_number].extract_text(extraction_mode="plain").strip())
+        for page_number in range(start, stop)
+    ]
+
+
+def split_pages(file_path: str, pages: List[Tuple[int, str]]) -> list:
+    """Split page texts on markdown headers and tag every chunk with its source page."""
+    filename = os.path.basename(file_path)
+    splitter = get_splitter()
+    docs = []
+    for page_number, text in pages:
+        split_docs = splitter.split_text(text)
+        for d in split_docs:
+            d.metadata.update({"source": f"{filename} (page {page_number})"})
+        docs.extend(split_docs)
+    return docs
+
+
+def pdf_files(directory_path: str) -> List[str]:
+    """PDF paths of the knowledge base directory, sorted so chunk order is stable between runs."""
+    return [
+        os.path.join(directory_path, filename)
+        for filename in sorted(os.listdir(directory_path))
+        if os.path.isfile(os.path.join(directory_path, filename)) and filename.endswith(".pdf")
+    ]
+
+
+def page_tasks(file_paths: List[str], pages_per_task: int) -> List[PageRange]:
+    tasks = []
+    for file_path in file_paths:
+        n_pages = len(PdfReader(file_path).pages)
+        for start in range(0, n_pages, pages_per_task):
+            tasks.append((file_path, start, min(start + pages_per_task, n_pages)))
+    return tasks
+
+
+def iter_page_batches(
+    file_paths: List[str],
+    workers: Optional[int] = None,
+    pages_per_task: int = 4,
+    min_parallel_pages: int = 48,
+) -> Iterator[Tuple[str, List[Tuple[int, str]]]]:
+    """
+    Yield (file_path, [(page_number, text)]) one page range at a time, in document order, while
+    the remaining ranges are still being extracted by the pool.
+    Inputs under `min_parallel_pages` pages are parsed in-process: starting workers costs
+    more than parsing a short menu.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = page_tasks(file_paths, pages_per_task)
+    n_pages = sum(stop - start for _, start, stop in tasks)
+    if workers <= 1 or len(tasks) <= 1 or n_pages < min_parallel_pages:
+        for task in tasks:
+            yield task[0], extract_page_range(task)
+        return
+
+    # spawn, not fork: the parent may already run torch / tokenizer threads
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=ctx) as pool:
+        for task, pages in zip(tasks, pool.map(extract_page_range, tasks)):
+            yield task[0], pages
+
+
+def iter_document_batches(
+    file_paths: List[str],
+    workers: Optional[int] = None,
+    pages_per_task: int = 4,
+    min_parallel_pages: int = 48,
+) -> Iterator[Tuple[str, list]]:
+    """Yield (file_path, chunks) one page range at a time, in document order (see iter_page_batches)."""
+    for file_path, pages in iter_page_batches(file_paths, workers, pages_per_task, min_parallel_pages):
+        yield file_path, split_pages(file_path, pages)
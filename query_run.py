@@ -1,3 +1,5 @@
+import threading
+
 from langchain.chat_models import init_chat_model
 from langchain_classic.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
@@ -5,7 +7,14 @@ from chat_model import chat_model
 from datetime import datetime
 
 class QueryRun:
+    """
+    Base of the prompt classes in prompt_templates: a subclass sets system_message, human_message
+    and optionally output_schema. Its prompt | chat_model | parser chain, format instructions
+    included, is compiled once per subclass on first use; instances hold no state, so one
+    instance per class can serve every call.
+    """
     output_schema = None   # subclasses override this
+    _compile_lock = threading.Lock()
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -13,21 +22,41 @@ class QueryRun:
             cls.output_parser = PydanticOutputParser(pydantic_object=cls.output_schema)
         else:
             cls.output_parser = None
+        cls._compiled = None   # (chat model, chain), see chain()
 
-    def execute_query(self, query, conversation_history="", context="", order="", customer_details="", booking="", current_complain="", parser=None):
-        # Default parser comes from subclass
-        parser = parser or self.__class__.output_parser
-
-        # Prompt template
+    @classmethod
+    def build_chain(cls, parser=None):
+        """Prompt | chat_model (| parser), with the parser's format instructions filled in."""
         final_prompt_template = ChatPromptTemplate.from_messages([
-            ("system", self.system_message),
-            ("human", self.human_message + ("\n\n{format_instructions}" if parser else ""))
+            ("system", cls.system_message),
+            ("human", cls.human_message + ("\n\n{format_instructions}" if parser else ""))
         ])
+        if parser:
+            final_prompt_template = final_prompt_template.partial(format_instructions=parser.get_format_instructions())
 
-        # Chain with model
         final_chain = final_prompt_template | chat_model
         if parser:
             final_chain = final_chain | parser
+        return final_chain
+
+    @classmethod
+    def chain(cls):
+        """The compiled chain of this subclass (rebuilt only if chat_model was replaced)."""
+        compiled = cls._compiled
+        if compiled is None or compiled[0] is not chat_model:
+            with QueryRun._compile_lock:
+                compiled = cls._compiled
+                if compiled is None or compiled[0] is not chat_model:
+                    compiled = (chat_model, cls.build_chain(cls.output_parser))
+                    cls._compiled = compiled
+        return compiled[1]
+
+    def execute_query(self, query, conversation_history="", context="", order="", customer_details="", booking="", current_complain="", parser=None):
+        # Default parser comes from subclass; a caller-supplied one gets a chain of its own
+        if parser is None or parser is self.output_parser:
+            final_chain = self.chain()
+        else:
+            final_chain = self.build_chain(parser)
 
         # Inputs
         inputs = {
@@ -40,9 +69,7 @@ class QueryRun:
             "current_complaint": current_complain,
             "current_date": datetime.now().strftime("%Y-%m-%d"),
         }
-        if parser:
-            inputs["format_instructions"] = parser.get_format_instructions()
 
         # Run
         answer = final_chain.invoke(inputs)
-        return answer
\ No newline at end of file
+        return answer
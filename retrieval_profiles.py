@@ -0,0 +1,79 @@
+"""
+Retrieval settings per caller: how many BM25 / FAISS candidates, how many reranked chunks are
+kept, and which sections of the knowledge base are searched at all.
+
+Section filters are regexes (case-insensitive, `search`) on the h1 / h2 / h3 header metadata of
+the chunks; a merged chunk matches an h3 filter if any of its `sections` does. Filtered chunks
+are excluded from BM25 scoring and from the FAISS search (id selector), so a narrow profile
+also means fewer candidates for the cross-encoder.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from config import RETRIEVAL_ORDER_SECTIONS
+
+
+@dataclass(frozen=True)
+class RetrievalProfile:
+    name: str
+    bm25_k: int = 5
+    vector_k: int = 4
+    rerank_top_n: int = 10
+    sections: Dict[str, str] = field(default_factory=dict)   # header level (h1/h2/h3) -> regex
+
+    def matches(self, metadata: dict) -> bool:
+        """Whether a chunk with this metadata is searched by the profile."""
+        for level, pattern in self.sections.items():
+            values = [metadata.get(level)]
+            if level == "h3":
+                values += metadata.get("sections") or []
+            if not any(v and re.search(pattern, v, re.IGNORECASE) for v in values):
+                return False
+        return True
+
+
+PROFILES: Dict[str, RetrievalProfile] = {
+    # menu questions, dish descriptions, policies, locations: every section
+    "information": RetrievalProfile("information", bm25_k=5, vector_k=4, rerank_top_n=10),
+    # items and prices only, a handful of chunks for the order checker prompt
+    "order": RetrievalProfile(
+        "order", bm25_k=4, vector_k=4, rerank_top_n=6, sections={"h2": RETRIEVAL_ORDER_SECTIONS}
+    ),
+}
+
+
+def get_profile(name: Optional[str]) -> Optional[RetrievalProfile]:
+    if name is None:
+        return None
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown retrieval profile '{name}', expected one of {sorted(PROFILES)}") from None
+
+
+def apply_profile(retriever, profile: RetrievalProfile):
+    """
+    Copy of an assembled retriever (see knowledge_base.assemble_retriever) using `profile`.
+    The copy shares the indexes, models and adaptive-rerank counters of `retriever`.
+    With the EnsembleRetriever first stage only the rerank depth applies.
+    """
+    from langchain_classic.retrievers import ContextualCompressionRetriever
+
+    from adaptive_rerank import AdaptiveRerankRetriever
+    from hybrid_retriever import HybridRRFRetriever
+
+    def first_stage(hybrid):
+        return hybrid.with_profile(profile) if isinstance(hybrid, HybridRRFRetriever) else hybrid
+
+    if isinstance(retriever, AdaptiveRerankRetriever):
+        return retriever.model_copy(update={
+            "ensemble": first_stage(retriever.ensemble),
+            "reranker": retriever.reranker.model_copy(update={"top_n": profile.rerank_top_n}),
+        })
+    if isinstance(retriever, ContextualCompressionRetriever):
+        return retriever.model_copy(update={
+            "base_retriever": first_stage(retriever.base_retriever),
+            "base_compressor": retriever.base_compressor.model_copy(update={"top_n": profile.rerank_top_n}),
+        })
+    return first_stage(retriever)
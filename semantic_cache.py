@@ -0,0 +1,117 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Cache of (query -> final answer) matched by embedding similarity instead of exact text,
+    so paraphrases of an already answered question ("what time do you close" /
+    "when do you shut") are answered without retrieval or an LLM call.
+
+    - embed_fn: returns the embedding of a query (the retriever's embedder is reused)
+    - threshold: minimum cosine similarity for a hit
+    - maxsize: number of answers kept; the least recently used one is evicted first
+
+    Answers are tagged with the knowledge-base version they were generated from: a lookup only
+    hits answers of the version it passes, and store() drops an answer whose version is no
+    longer the live one (set by clear(version) when a new knowledge base goes live).
+    """
+
+    def __init__(self, embed_fn: Callable[[str], List[float]], threshold: float = 0.92, maxsize: int = 256):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None   # (n, dim), L2-normalised rows
+        self._queries: List[str] = []
+        self._answers: List[str] = []
+        self._versions: List[Optional[str]] = []
+        self._last_used: List[int] = []
+        self._clock = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_drops = 0
+        self.version: Optional[str] = None   # live knowledge-base version, None = not known yet
+
+    def embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query: str, version: Optional[str] = None) -> Tuple[Optional[str], np.ndarray]:
+        """
+        Return (answer, query_vector). answer is None on a miss; pass query_vector
+        back to store() so the query is not embedded twice. With a `version`, only answers
+        generated from that knowledge-base version can hit.
+        """
+        vector = self.embed(query)
+        with self._lock:
+            if self._vectors is not None and len(self._answers):
+                sims = self._vectors @ vector
+                if version is not None:
+                    sims[np.asarray(self._versions, dtype=object) != version] = -np.inf
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self._clock += 1
+                    self._last_used[best] = self._clock
+                    self.hits += 1
+                    print(f"[i] Semantic cache hit ({sims[best]:.3f}): '{query}' ~ '{self._queries[best]}'")
+                    return self._answers[best], vector
+            self.misses += 1
+        return None, vector
+
+    def store(
+        self, query: str, answer: str, vector: Optional[np.ndarray] = None, version: Optional[str] = None
+    ) -> None:
+        """Cache `answer`, generated from knowledge-base `version` (dropped if that is no longer live)."""
+        if self.maxsize <= 0 or not answer:
+            return
+        if vector is None:
+            vector = self.embed(query)
+        with self._lock:
+            if version is not None and self.version is not None and version != self.version:
+                self.stale_drops += 1
+                print(f"[i] Semantic cache: answer of knowledge base {version} not cached, {self.version} is live")
+                return
+            self._clock += 1
+            if self._vectors is not None and len(self._answers) >= self.maxsize:
+                # overwrite the least recently used slot
+                slot = int(np.argmin(self._last_used))
+                self._vectors[slot] = vector
+                self._queries[slot] = query
+                self._answers[slot] = answer
+                self._versions[slot] = version
+                self._last_used[slot] = self._clock
+                self.evictions += 1
+                return
+            row = vector[None, :]
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+            self._queries.append(query)
+            self._answers.append(answer)
+            self._versions.append(version)
+            self._last_used.append(self._clock)
+
+    def clear(self, version: Optional[str] = None) -> None:
+        """Drop every answer; `version` becomes the live knowledge-base version."""
+        with self._lock:
+            self._vectors = None
+            self._queries, self._answers, self._versions, self._last_used = [], [], [], []
+            self.version = version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._answers),
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "stale_drops": self.stale_drops,
+                "version": self.version,
+            }
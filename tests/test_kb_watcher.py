@@ -0,0 +1,54 @@
+import os
+import threading
+import time
+
+from watchdog.events import FileClosedNoWriteEvent, FileModifiedEvent, FileOpenedEvent
+
+from kb_watcher import KnowledgeBaseWatcher
+
+
+class ReadingRegistry:
+    """Stands in for KnowledgeBaseRegistry: refresh() reads every PDF, as checksumming does."""
+
+    def __init__(self, directory_path):
+        self.directory_path = str(directory_path)
+        self.version = "v1"
+        self.refreshes = 0
+        self.refreshed = threading.Event()
+
+    def refresh(self):
+        self.refreshes += 1
+        for filename in os.listdir(self.directory_path):
+            with open(os.path.join(self.directory_path, filename), "rb") as fh:
+                fh.read()
+        self.refreshed.set()
+        return True
+
+
+def test_read_events_do_not_arm_the_timer(tmp_path):
+    watcher = KnowledgeBaseWatcher(ReadingRegistry(tmp_path), debounce_s=0.05)
+    pdf = str(tmp_path / "menu.pdf")
+    watcher.on_any_event(FileOpenedEvent(pdf))
+    watcher.on_any_event(FileClosedNoWriteEvent(pdf))
+    assert watcher._timer is None
+
+    watcher.on_any_event(FileModifiedEvent(pdf))
+    assert watcher._timer is not None
+    watcher.stop()
+
+
+def test_read_only_refresh_does_not_rearm(tmp_path):
+    pdf = tmp_path / "menu.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    registry = ReadingRegistry(tmp_path)
+    watcher = KnowledgeBaseWatcher(registry, debounce_s=0.1)
+    watcher.start()
+    try:
+        with open(pdf, "ab") as fh:
+            fh.write(b"% appended\n")
+        assert registry.refreshed.wait(5)
+        # the refresh's own reads must not schedule another one
+        time.sleep(1.0)
+        assert registry.refreshes == 1
+    finally:
+        watcher.stop()